@@ -1,17 +1,22 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
+import os
 import time
 import random
-import threading
-from simulation import run_simulation, state
+from simulation import get_backend, movements, state_bus, with_stations, profiler as simulation_profiler
 
 # utils import karne ka
 from utils.data_generator import TrainDataGenerator
 from utils.network_map import NetworkMap
-from utils.train_controller import TrainController
+from utils.train_controller import TrainController, reroute_via
+from utils.decision_journal import DecisionJournal, journal_now
+from utils.timeseries import TimeSeriesStore
+from utils.profiling import TickProfiler
 
 # Page configuration karne ka
 st.set_page_config(
@@ -21,25 +26,111 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Run the backend in a separate thread
-if "sim_started" not in st.session_state:
-    threading.Thread(target=run_simulation, daemon=True).start()
-    st.session_state.sim_started = True
+# Refresh mode: "fragments" refreshes each panel on its own cadence,
+# "rerun" redraws the whole page whenever the simulation publishes
+REFRESH_MODE = os.environ.get("DASHBOARD_REFRESH_MODE", "fragments")
+
+# Seconds between refreshes of each panel in fragment mode
+PANEL_REFRESH_SECONDS = {
+    "recommendations": 5,
+    "train_list": 2,
+    "metrics": 3,
+    "network_map": 10,
+    "render_times": 10,
+    "diagnostics": 5,
+}
+
+# Set DASHBOARD_DIAGNOSTICS=1 to show per-phase timings of the simulation and the dashboard
+DIAGNOSTICS = os.environ.get("DASHBOARD_DIAGNOSTICS", "") not in ("", "0")
+
+# Metrics kept in the trend history, and the spans the trend chart can show
+TREND_METRICS = ("avg_delay", "throughput", "utilization")
+TREND_WINDOWS = {"Last hour": 3600, "Shift (8 h)": 8 * 3600, "Day": 24 * 3600}
+
+# One simulation backend for the whole process, shared by every session
+# Set SIMULATION_REPLAY to a recorded event log to replay it instead of simulating,
+# SIMULATION_PROFILE to a file to save its tick profile to, and
+# SIMULATION_ALLOC_SAMPLE_EVERY to trace allocations on every n-th tick
+@st.cache_resource
+def simulation_backend():
+    replay_speed = os.environ.get("SIMULATION_REPLAY_SPEED", "1")
+    alloc_sample_every = os.environ.get("SIMULATION_ALLOC_SAMPLE_EVERY")
+    return get_backend(
+        replay=os.environ.get("SIMULATION_REPLAY"),
+        replay_speed=None if replay_speed == "max" else float(replay_speed),
+        profile=os.environ.get("SIMULATION_PROFILE"),
+        alloc_sample_every=int(alloc_sample_every) if alloc_sample_every else None
+    )
+
+backend = simulation_backend()
+
+# One decision journal for the control room, kept on disk across restarts
+DECISIONS_DIR = os.environ.get("DASHBOARD_DECISIONS_DIR", "decisions")
+
+@st.cache_resource
+def decision_journal():
+    return DecisionJournal(DECISIONS_DIR)
+
+# Time spent in the dashboard's own hot paths, across all sessions
+@st.cache_resource
+def dashboard_profiler():
+    return TickProfiler()
+
+profiler = dashboard_profiler()
 
 
 # Session State initilise karne ka
-if "train_generator" not in st.session_state:
-    st.session_state.train_generator = TrainDataGenerator()
 if "network_map" not in st.session_state:
     st.session_state.network_map = NetworkMap()
+if "train_generator" not in st.session_state:
+    st.session_state.train_generator = TrainDataGenerator(route_graph=st.session_state.network_map.graph)
 if "train_controller" not in st.session_state:
-    st.session_state.train_controller = TrainController()
+    st.session_state.train_controller = TrainController(
+        route_graph=st.session_state.network_map.graph, movements=movements, journal=decision_journal()
+    )
 if "last_update" not in st.session_state:
     st.session_state.last_update = datetime.now(ZoneInfo("Asia/Kolkata"))
 if "decisions_log" not in st.session_state:
-    st.session_state.decisions_log = []
+    st.session_state.decisions_log = decision_journal()
 if "metrics_history" not in st.session_state:
-    st.session_state.metrics_history = []
+    st.session_state.metrics_history = TimeSeriesStore(TREND_METRICS)
+if "panel_cache" not in st.session_state:
+    st.session_state.panel_cache = {}
+if "panel_timings" not in st.session_state:
+    st.session_state.panel_timings = {}
+
+# Panel refresh helpers
+def cached_panel_data(panel, version, build):
+    """Rebuild a panel's data only when its data version changed"""
+    cached = st.session_state.panel_cache.get(panel)
+    if cached is None or cached[0] != version:
+        cached = st.session_state.panel_cache[panel] = (version, build())
+    return cached[1]
+
+@contextmanager
+def timed_panel(panel):
+    """Record how long a panel takes to render"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = st.session_state.panel_timings.setdefault(panel, deque(maxlen=50))
+        timings.append(time.perf_counter() - start)
+
+def profiled(phase, build, *args):
+    """Call `build(*args)`, timing it as a dashboard phase"""
+    with profiler.phase(phase):
+        return build(*args)
+
+def run_panel(panel, render):
+    """Render a panel; in fragment mode it then refreshes on its own cadence"""
+    def refresh():
+        with timed_panel(panel):
+            render()
+    if REFRESH_MODE == "fragments":
+        st.fragment(refresh, run_every=PANEL_REFRESH_SECONDS[panel])()
+    else:
+        refresh()
 
 # real time data update karne ka re
 def update_real_time_data():
@@ -56,21 +147,16 @@ def update_real_time_data():
             st.session_state.last_update = current_time
 
     if current_time - st.session_state.last_update > timedelta(seconds=3):
-        st.session_state.train_generator.update_trains()
+        with profiler.phase("update_trains"):
+            st.session_state.train_generator.update_trains()
         st.session_state.last_update = current_time
 
         # Update metrics history
-        metrics = st.session_state.train_controller.calculate_metrics(
-            st.session_state.train_generator.trains
-        )
-        st.session_state.metrics_history.append({
-            "timestamp": current_time,
-            "metrics": metrics
-        })
-
-        # Keep only last 20
-        if len(st.session_state.metrics_history) > 20:
-            st.session_state.metrics_history = st.session_state.metrics_history[-20:]
+        with profiler.phase("calculate_metrics"):
+            metrics = st.session_state.train_controller.calculate_metrics(
+                st.session_state.train_generator.trains
+            )
+        st.session_state.metrics_history.append(metrics, at=current_time.timestamp())
 
 # Top Bar type shi
 def create_top_bar():
@@ -79,6 +165,10 @@ def create_top_bar():
     current_time = datetime.now(ZoneInfo("Asia/Kolkata")).strftime("%Y-%m-%d %H:%M:%S")
     st.markdown(f"<h3 style='text-align: center; margin-bottom: 20px;'>🕐 {current_time}</h3>", unsafe_allow_html=True)
 
+    health = backend.health()
+    if not health["healthy"]:
+        st.error(f"Simulation backend is not healthy: {health['error'] or 'no recent ticks'}")
+
     # st.markdown("<h3 style='text-align: center; margin-bottom: 20px;'>🎛️ System Controls</h3>", unsafe_allow_html=True)
 
     # col1, col2, col3, col4, col5 = st.columns([1, 1, 1, 1, 1])
@@ -92,41 +182,51 @@ def create_top_bar():
     #         st.error("Breakdown simulated!")
     # with col4:
     #     if st.button("🔄 Reset System", type="primary", use_container_width=True):
-    #         st.session_state.train_generator = TrainDataGenerator()
-    #         st.session_state.decisions_log = []
-    #         st.session_state.metrics_history = []
+    #         st.session_state.train_generator = TrainDataGenerator(route_graph=st.session_state.network_map.graph)
+    #         st.session_state.decisions_log = decision_journal()
+    #         st.session_state.metrics_history = TimeSeriesStore(TREND_METRICS)
     #         st.success("System reset!")
 
 
-def create_train_list_panel():
+def create_train_list_panel(snapshot):
     """Create the left panel with train list"""
     st.subheader("🟢 Active Trains")
-    for train in state["active_trains"]:
-        st.write(f"{train['name']} ({train['type']}) on {train['route']}")
+    lines = cached_panel_data("train_list", snapshot.version, lambda: [
+        f"{train['name']} ({train['type']}) on {train['route']}" for train in snapshot.data["active_trains"]
+    ])
+    for line in lines:
+        st.write(line)
 
-def create_network_map_panel():
+def create_network_map_panel(snapshot):
     """Create the center panel with network map"""
     st.subheader("🗺️ Network Map")
+    update_real_time_data()
     
-    # Create the network visualization
-    network_fig = st.session_state.network_map.create_network_figure(
-        st.session_state.train_generator.trains
+    # Create the network visualization (only when the trains or the network changed)
+    trains = st.session_state.train_generator.trains
+    network_map = st.session_state.network_map
+    network_fig = cached_panel_data(
+        "network_map", (trains.version, network_map.version),
+        lambda: profiled("network_figure", network_map.create_network_figure, trains)
     )
     
     st.plotly_chart(network_fig, height=500)
     
     # Network status indicators
     st.subheader("📊 Track Status")
-    for train, status in state["track_status"].items():
+    for train, status in snapshot.data["track_status"].items():
         st.write(f"{train} → {status}")
 
 def create_metrics_panel():
     """Create the right panel with metrics and recommendations"""
     st.subheader("📈 Performance Metrics")
+    update_real_time_data()
     
-    # Calculate current metrics
-    current_metrics = st.session_state.train_controller.calculate_metrics(
-        st.session_state.train_generator.trains
+    # Calculate current metrics (only when the trains changed)
+    trains = st.session_state.train_generator.trains
+    current_metrics = cached_panel_data(
+        "metrics", trains.version,
+        lambda: st.session_state.train_controller.calculate_metrics(trains)
     )
     
     # Display KPI cards
@@ -151,45 +251,62 @@ def create_metrics_panel():
         )
     
     # Metrics trend chart
-    # if len(st.session_state.metrics_history) > 1:
-    #     st.markdown("### 📊 Trends")
-        
-    #     # Create trend data
-    #     timestamps = [entry['timestamp'] for entry in st.session_state.metrics_history]
-    #     delays = [entry['metrics']['avg_delay'] for entry in st.session_state.metrics_history]
-    #     throughput = [entry['metrics']['throughput'] for entry in st.session_state.metrics_history]
-        
-    #     fig = go.Figure()
-    #     fig.add_trace(go.Scatter(x=timestamps, y=delays, name="Avg Delay (min)", line=dict(color='red')))
-    #     fig.add_trace(go.Scatter(x=timestamps, y=throughput, name="Throughput (trains/hr)", 
-    #                            line=dict(color='blue'), yaxis='y2'))
-        
-    #     fig.update_layout(
-    #         height=200,
-    #         yaxis=dict(title="Delay (min)", side="left"),
-    #         yaxis2=dict(title="Throughput", overlaying="y", side="right"),
-    #         margin=dict(l=0, r=0, t=0, b=0)
-    #     )
-        
-    #     st.plotly_chart(fig)
+    history = st.session_state.metrics_history
+    if len(history) > 1:
+        st.markdown("### 📊 Trends")
+        window = st.radio("Trend window", list(TREND_WINDOWS), horizontal=True,
+                          key="trend_window", label_visibility="collapsed")
+        fig = cached_panel_data(
+            "trends", (history.version, window),
+            lambda: profiled("trend_figure", create_trend_figure, history, time.time() - TREND_WINDOWS[window])
+        )
+        st.plotly_chart(fig)
     
     # Decision log
     st.markdown("### 📋 Recent Decisions")
     if st.session_state.decisions_log:
-        recent_decisions = st.session_state.decisions_log[-5:]  # Last 5 decisions
+        recent_decisions = st.session_state.decisions_log.recent(5)  # Last 5 decisions
         for decision in reversed(recent_decisions):
-            status_color = "🟢" if decision['status'] == 'Applied' else "🔴"
+            status_color = "🟢" if decision.get('status', 'Applied') == 'Applied' else "🔴"
             st.markdown(f"{status_color} **{decision['timestamp'].strftime('%H:%M:%S')}** - {decision['action']}")
     else:
         st.info("No decisions recorded yet.")
 
+def create_trend_figure(history, since):
+    """Trend chart of the rolled-up metric history since `since`
+
+    The history answers from its coarsest-needed rollup, so a day of data is
+    a few hundred points at most. Delay is drawn with its min/max band.
+    """
+    series = history.query(since)
+    timestamps = pd.to_datetime(series["time"], unit="s", utc=True).tz_convert("Asia/Kolkata")
+    delay, throughput = series["avg_delay"], series["throughput"]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=timestamps, y=delay["max"], line=dict(width=0), hoverinfo="skip", showlegend=False))
+    fig.add_trace(go.Scatter(x=timestamps, y=delay["min"], line=dict(width=0), fill="tonexty",
+                             fillcolor="rgba(255,0,0,0.15)", hoverinfo="skip", showlegend=False))
+    fig.add_trace(go.Scatter(x=timestamps, y=delay["mean"], name="Avg Delay (min)", line=dict(color='red')))
+    fig.add_trace(go.Scatter(x=timestamps, y=throughput["mean"], name="Throughput (trains/hr)",
+                             line=dict(color='blue'), yaxis='y2'))
+
+    fig.update_layout(
+        height=200,
+        yaxis=dict(title="Delay (min)", side="left"),
+        yaxis2=dict(title="Throughput", overlaying="y", side="right"),
+        margin=dict(l=0, r=0, t=0, b=0)
+    )
+    return fig
+
+def create_manual_log_panel():
+    """Manual log form; outside the refreshing panels so typing is not interrupted"""
     # Manual Log Entry
     st.markdown("### 📝 Manual Log Entry")
     manual_action = st.text_input("Enter manual action or recommendation:")
     if st.button("Log Manual Entry", key="manual_log"):
         if manual_action:
             st.session_state.decisions_log.append({
-                'timestamp': datetime.now(ZoneInfo("Asia/Kolkata")),
+                'timestamp': journal_now(),
                 'action': manual_action,
                 'status': 'Applied'  # Assuming manual entries are always applied
             })
@@ -198,25 +315,63 @@ def create_metrics_panel():
         else:
             st.warning("Please enter an action to log.")
 
-def main():
-    """Main application function"""
-    # Auto-refresh setup
-    placeholder = st.empty()
-    
-    # Update real-time data
-    update_real_time_data()
-    
-    # Create the dashboard layout
-    create_top_bar()
-    
-    st.markdown("---")
-    
-    # 🚀 AI Recommendations FIRST
-    st.markdown("<h2 style='text-align: center; margin-bottom: 30px;'>🤖 AI Recommendations</h2>", unsafe_allow_html=True)
+def create_render_times_panel():
+    """Show how long each panel takes to render"""
+    with st.expander("⏱️ Panel render times"):
+        rows = [
+            {
+                "Panel": panel,
+                "Last (ms)": round(timings[-1] * 1000, 1),
+                "Mean (ms)": round(sum(timings) / len(timings) * 1000, 1),
+                "Renders": len(timings)
+            }
+            for panel, timings in st.session_state.panel_timings.items() if timings
+        ]
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True)
+        else:
+            st.info("No panels rendered yet.")
+
+def phase_rows(summary):
+    """One table row per profiled phase, slowest (p95) first"""
+    rows = [
+        {
+            "Phase": phase,
+            "Calls": stats["count"],
+            "Mean (ms)": round(stats["mean_ms"], 2),
+            "p95 (ms)": round(stats["p95_ms"], 2),
+            "Max (ms)": round(stats["max_ms"], 2),
+            "Peak alloc (KB)": None if stats["peak_kb"] is None else round(stats["peak_kb"], 1)
+        }
+        for phase, stats in summary["phases"].items()
+    ]
+    return sorted(rows, key=lambda row: row["p95 (ms)"], reverse=True)
+
+def create_diagnostics_panel():
+    """Per-phase timings of the simulation ticks and of the dashboard's hot paths"""
+    with st.expander("🩺 Diagnostics", expanded=True):
+        simulation = simulation_profiler.summary()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Simulation ticks", simulation["ticks"])
+        col2.metric("Budget overruns", simulation["overruns"])
+        col3.metric("Tick budget", f"{simulation['budget_ms']:.0f} ms" if simulation["budget_ms"] else "-")
+        st.markdown("**Simulation phases**")
+        rows = phase_rows(simulation)
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True)
+        else:
+            st.info("No simulation ticks yet.")
+        st.markdown("**Dashboard phases**")
+        rows = phase_rows(profiler.summary())
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True)
+        else:
+            st.info("No dashboard updates yet.")
 
-    # Sort recommendations by the 'priority' field, treating it as a number.
-    # The lowest number (e.g., 1) is the highest priority.
-    recommendations = sorted(state["recommendations"], key=lambda x: x.get('priority', float('inf')))
+def create_recommendations_panel(snapshot):
+    """Create the recommendation cards"""
+    # Recommendations come from the simulation already in order, best first
+    recommendations = snapshot.data["recommendations"]
 
     rec_col1, rec_col2, rec_col3 = st.columns(3, gap="large")
 
@@ -226,6 +381,9 @@ def main():
     for i, rec_col in enumerate([rec_col1, rec_col2, rec_col3]):
         if i < len(recommendations):
             rec = recommendations[i]
+            # Simulation events name the train, not its stations; look those up to find a reroute
+            via = reroute_via(st.session_state.train_controller.suggest_reroute(with_stations(rec)))
+            action = f"{rec.get('name', 'N/A')} {via} to reduce delay" if via else rec.get('name', 'N/A')
             with rec_col:
                 st.markdown(f"""
                 <div style="
@@ -238,15 +396,16 @@ def main():
                     color: white;
                 ">
                     <h4 style='color: {colors[i]}; margin-bottom: 15px;'>🎯 Recommendation {i+1}</h4>
-                    <p><strong>Action:</strong> {rec.get('name', 'N/A')} via alternative track to reduce delay</p>
+                    <p><strong>Action:</strong> {action}</p>
                     <p><strong>Reason:</strong> Train is delayed by {rec.get('delay', 0)} minutes</p>
                     <p><strong>Priority:</strong> {rec.get('priority', 'N/A')}</p>
+                    <p><strong>Decision:</strong> {rec.get('decision', 'N/A')} (hold {rec.get('hold_minutes', 0):.0f} min)</p>
                 </div>
                 """, unsafe_allow_html=True)
 
                 if st.button("✅ Apply Recommendation", key=f"apply_{i+1}", use_container_width=True, type="primary"):
                     st.session_state.decisions_log.append({
-                        'timestamp': datetime.now(),
+                        'timestamp': journal_now(),
                         'action': f"Applied: {rec.get('name', 'N/A')}",
                         'status': 'Applied'
                     })
@@ -254,11 +413,30 @@ def main():
 
                 if st.button("❌ Dismiss", key=f"dismiss_{i+1}", use_container_width=True):
                     st.session_state.decisions_log.append({
-                        'timestamp': datetime.now(),
+                        'timestamp': journal_now(),
                         'action': f"Dismissed: {rec.get('name', 'N/A')}",
                         'status': 'Dismissed'
                     })
                     st.info("Recommendation Dismissed!")
+
+def main():
+    """Main application function"""
+    # Update real-time data
+    update_real_time_data()
+
+    # Fragment panels read the latest version on every refresh; a full-page
+    # rerun pins one consistent version for the whole run
+    pinned = state_bus.latest()
+    snapshot = state_bus.latest if REFRESH_MODE == "fragments" else lambda: pinned
+    
+    # Create the dashboard layout
+    create_top_bar()
+    
+    st.markdown("---")
+    
+    # 🚀 AI Recommendations FIRST
+    st.markdown("<h2 style='text-align: center; margin-bottom: 30px;'>🤖 AI Recommendations</h2>", unsafe_allow_html=True)
+    run_panel("recommendations", lambda: create_recommendations_panel(snapshot()))
     
     st.markdown("---")  # separator between recs and main panels
 
@@ -266,17 +444,23 @@ def main():
     col1, col2, col3 = st.columns([1, 2, 1.2])
     
     with col1:
-        create_train_list_panel()
+        run_panel("train_list", lambda: create_train_list_panel(snapshot()))
     
     with col2:
-        create_network_map_panel()
+        run_panel("network_map", lambda: create_network_map_panel(snapshot()))
     
     with col3:
-        create_metrics_panel()
+        run_panel("metrics", create_metrics_panel)
+        create_manual_log_panel()
+
+    run_panel("render_times", create_render_times_panel)
+    if DIAGNOSTICS:
+        run_panel("diagnostics", create_diagnostics_panel)
     
-    # Auto-refresh every 3 seconds
-    time.sleep(5)
-    st.rerun()
+    if REFRESH_MODE != "fragments":
+        # Auto-refresh once the simulation publishes a new version (at most every 5 seconds)
+        state_bus.wait_for_version(pinned.version, timeout=5)
+        st.rerun()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+"""Build time and payload size of NetworkMap figures, before and after layer caching
+
+Uses a synthetic network of a few thousand track segments, closer to a real
+zone than the built-in demo network. Run from the repository root:
+
+    python -m benchmarks.bench_network_map
+"""
+import random
+import time
+
+import plotly.graph_objects as go
+
+from utils.data_generator import TrainDataGenerator
+from utils.network_map import NetworkMap
+
+NUM_STATIONS = 1_500
+NUM_TRACKS = 3_000
+NUM_TRAINS = 1_000
+REFRESHES = 5
+
+
+def synthetic_network(network_map: NetworkMap, seed: int = 0):
+    """Replace the demo network with a random one of realistic size"""
+    rng = random.Random(seed)
+    network_map.stations = {
+        f'Station {i}': {'lat': rng.uniform(8, 30), 'lon': rng.uniform(70, 90)}
+        for i in range(NUM_STATIONS)
+    }
+    names = list(network_map.stations)
+    network_map.tracks = [
+        {'from': rng.choice(names), 'to': rng.choice(names),
+         'status': rng.choice(['normal', 'normal', 'normal', 'congested', 'maintenance'])}
+        for _ in range(NUM_TRACKS)
+    ]
+    network_map.invalidate()
+
+
+def legacy_figure(network_map: NetworkMap, trains) -> go.Figure:
+    """The original build: one trace per track segment, rebuilt on every call"""
+    fig = go.Figure()
+    color_map = {'normal': 'green', 'congested': 'orange', 'maintenance': 'red'}
+    for track in network_map.tracks:
+        from_station = network_map.stations[track['from']]
+        to_station = network_map.stations[track['to']]
+        fig.add_trace(go.Scattermapbox(
+            lat=[from_station['lat'], to_station['lat']],
+            lon=[from_station['lon'], to_station['lon']],
+            mode='lines',
+            line=dict(color=color_map.get(track['status'], 'gray'),
+                      width=4 if track['status'] == 'congested' else 2),
+            name=f"Track {track['from']}-{track['to']}",
+            hovertext=f"Status: {track['status'].title()}",
+            showlegend=False
+        ))
+    network_map._add_stations_to_figure(fig)
+    network_map._add_trains_to_figure(fig, trains)
+    fig.update_layout(
+        title="Indian Railway Network Status", showlegend=True, height=500,
+        mapbox=dict(style="open-street-map", center=dict(lat=20.0, lon=77.0), zoom=5),
+        margin=dict(l=0, r=0, t=30, b=0)
+    )
+    return fig
+
+
+def timed(build):
+    start = time.perf_counter()
+    fig = build()
+    return fig, time.perf_counter() - start
+
+
+def main():
+    network_map = NetworkMap()
+    synthetic_network(network_map)
+    generator = TrainDataGenerator(num_trains=NUM_TRAINS, seed=0)
+
+    fig, legacy_time = timed(lambda: legacy_figure(network_map, generator.trains))
+    legacy_traces, legacy_bytes = len(fig.data), len(fig.to_json())
+
+    fig, first_time = timed(lambda: network_map.create_network_figure(generator.trains))
+    refresh_times = []
+    for _ in range(REFRESHES):
+        generator.update_trains()
+        fig, elapsed = timed(lambda: network_map.create_network_figure(generator.trains))
+        refresh_times.append(elapsed)
+    cached_traces, cached_bytes = len(fig.data), len(fig.to_json())
+
+    print(f"{NUM_TRACKS} tracks, {NUM_STATIONS} stations, {NUM_TRAINS} trains")
+    print(f"{'':>18} {'traces':>8} {'payload KB':>12} {'build ms':>10}")
+    print(f"{'before':>18} {legacy_traces:>8} {legacy_bytes / 1024:>12.1f} {legacy_time * 1000:>10.1f}")
+    print(f"{'after (first)':>18} {cached_traces:>8} {cached_bytes / 1024:>12.1f} {first_time * 1000:>10.1f}")
+    print(f"{'after (refresh)':>18} {cached_traces:>8} {cached_bytes / 1024:>12.1f} "
+          f"{sum(refresh_times) / len(refresh_times) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
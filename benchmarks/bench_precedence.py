@@ -0,0 +1,59 @@
+"""Scaling of the conflict-aware precedence optimizer from 5 to 10k concurrent trains
+
+Reports a full solve, one incremental update and a full-batch sync against
+the simulation tick budget. Run from the repository root:
+
+    python -m benchmarks.bench_precedence
+"""
+import random
+import time
+
+from simulation import TICK_INTERVAL, routes
+from utils.precedence import PrecedenceOptimizer
+
+FLEET_SIZES = [5, 100, 1_000, 10_000]
+UPDATES = 200
+
+
+def make_batch(size: int, rng: random.Random):
+    return [
+        {
+            "id": f"T{i}",
+            "route": rng.choice(routes),
+            "priority": rng.randint(1, 3),
+            "delay": rng.choice([0, 5, 10, 15]),
+            "scheduled": rng.randint(1, 100)
+        }
+        for i in range(size)
+    ]
+
+
+def main():
+    rng = random.Random(0)
+    print(f"tick budget {TICK_INTERVAL * 1000:.0f} ms")
+    print(f"{'trains':>8} {'solve ms':>10} {'update ms':>10} {'sync ms':>10}")
+    for size in FLEET_SIZES:
+        batch = make_batch(size, rng)
+        optimizer = PrecedenceOptimizer()
+
+        start = time.perf_counter()
+        optimizer.solve(batch)
+        solve = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(UPDATES):
+            event = dict(rng.choice(batch), delay=rng.choice([0, 5, 10, 15, 20]))
+            optimizer.update(event)
+        update = (time.perf_counter() - start) / UPDATES
+
+        changed = make_batch(size, rng)
+        start = time.perf_counter()
+        optimizer.sync(changed)
+        optimizer.decisions()
+        sync = time.perf_counter() - start
+
+        print(f"{size:>8} {solve * 1000:>10.2f} {update * 1000:>10.4f} {sync * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
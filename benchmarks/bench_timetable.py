@@ -0,0 +1,63 @@
+"""Load time and peak memory of streaming a large timetable CSV into the fleet
+
+Run from the repository root: python -m benchmarks.bench_timetable [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utils.data_generator import TrainDataGenerator
+from utils.network_map import NetworkMap
+
+SECTIONS_PER_TRAIN = 4
+TYPES = ['Rajdhani Express', 'Mail Express', 'Passenger', 'Freight', 'MEMU', 'Vande Bharat']
+
+
+def write_timetable(path: str, rows: int, seed: int = 0):
+    """Write a synthetic timetable of `rows` sections, a few per train, along real tracks"""
+    rng = np.random.default_rng(seed)
+    tracks = NetworkMap().tracks
+    sections = np.array([f"{t['from']}-{t['to']}" for t in tracks], dtype=object)
+    trains = rows // SECTIONS_PER_TRAIN + 1
+    train = np.repeat(np.arange(trains), SECTIONS_PER_TRAIN)[:rows]
+    departure = rng.integers(0, 24 * 3600, size=trains)[train] + np.tile(np.arange(SECTIONS_PER_TRAIN) * 1800, trains)[:rows]
+    arrival = departure + 1500
+    as_time = lambda s: pd.to_datetime(s % (24 * 3600), unit='s').strftime('%H:%M')
+    pd.DataFrame({
+        'train_id': np.char.add('T', train.astype(str)),
+        'type': np.array(TYPES, dtype=object)[rng.integers(0, len(TYPES), size=trains)][train],
+        'priority': rng.integers(1, 4, size=trains)[train],
+        'arrival_time': as_time(arrival),
+        'departure_time': as_time(departure),
+        'section': sections[rng.integers(0, len(sections), size=rows)],
+    }).to_csv(path, index=False)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'timetable.csv')
+        write_timetable(path, rows)
+        print(f"timetable: {rows} rows, {os.path.getsize(path) / 1e6:.1f} MB on disk")
+
+        # Timed without tracemalloc, which slows allocation-heavy code severalfold
+        generator = TrainDataGenerator(seed=0)
+        start = time.perf_counter()
+        generator.load_timetable(path)
+        elapsed = time.perf_counter() - start
+        print(f"loaded {len(generator.trains)} trains in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)")
+
+        generator = TrainDataGenerator(seed=0)
+        tracemalloc.start()
+        generator.load_timetable(path)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"peak traced memory {peak / 1e6:.0f} MB, of which the loaded fleet keeps {retained / 1e6:.0f} MB")
+
+if __name__ == "__main__":
+    main()
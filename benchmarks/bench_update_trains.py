@@ -0,0 +1,53 @@
+"""Per-tick cost of TrainDataGenerator.update_trains at several fleet sizes
+
+Run from the repository root:
+
+    python -m benchmarks.bench_update_trains
+"""
+import random
+import time
+from statistics import median
+
+from utils.data_generator import TrainDataGenerator
+
+FLEET_SIZES = [25, 10_000, 100_000]
+TICKS = 20
+
+
+def legacy_update(trains):
+    """The original list-of-dicts update loop, kept for comparison"""
+    for train in trains:
+        if random.random() < 0.3:
+            if train['status'] == 'Delayed' and random.random() < 0.4:
+                train['status'] = 'On Time'
+            elif train['status'] == 'On Time' and random.random() < 0.1:
+                train['status'] = 'Delayed'
+                train['delay_minutes'] = random.randint(5, 20)
+        train['position']['lat'] += random.uniform(-0.001, 0.001)
+        train['position']['lon'] += random.uniform(-0.001, 0.001)
+        train['speed'] = max(20, min(120, train['speed'] + random.uniform(-5, 5)))
+        train['last_updated'] = time.time()
+
+
+def time_ticks(tick, ticks: int = TICKS) -> float:
+    """Median seconds per call of `tick`"""
+    samples = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        tick()
+        samples.append(time.perf_counter() - start)
+    return median(samples)
+
+
+def main():
+    print(f"{'trains':>8} {'columnar ms/tick':>18} {'legacy ms/tick':>16}")
+    for size in FLEET_SIZES:
+        generator = TrainDataGenerator(num_trains=size, seed=0)
+        legacy_trains = generator.trains.to_dicts()
+        columnar = time_ticks(generator.update_trains)
+        legacy = time_ticks(lambda: legacy_update(legacy_trains), ticks=5)
+        print(f"{size:>8} {columnar * 1000:>18.3f} {legacy * 1000:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Load test: the service with hundreds of delta-stream subscribers
+
+Starts the service in-process on a fast simulation, connects WebSocket
+subscribers that rebuild the state from the snapshot plus deltas, fires a
+burst of concurrent optimize requests, and checks every subscriber ended up
+with the state /data serves. Run from the repository root:
+
+    python -m benchmarks.load_service
+"""
+import asyncio
+import contextlib
+import io
+import json
+import random
+import time
+
+from tornado.httpclient import AsyncHTTPClient
+from tornado.websocket import websocket_connect
+
+from benchmarks.bench_precedence import make_batch
+from service import DeltaStream, OptimizeBatcher, make_app
+from simulation import SimulationBackend
+from utils.state_publisher import apply_delta
+
+SUBSCRIBER_COUNTS = [10, 100, 500]
+TICK_INTERVAL = 0.05  # seconds; much faster than the dashboard so the test is short
+DURATION = 3.0        # seconds per subscriber count
+OPTIMIZE_REQUESTS = 200
+PORT = 8599
+
+
+async def subscriber(url: str, stop: asyncio.Event, results: list):
+    """One client: keep the state up to date from the stream"""
+    connection = await websocket_connect(url)
+    version, state, messages = 0, None, 0
+    while not stop.is_set():
+        try:
+            message = await asyncio.wait_for(connection.read_message(), 0.5)
+        except asyncio.TimeoutError:
+            continue
+        if message is None:
+            break
+        record = json.loads(message)
+        messages += 1
+        if "state" in record:
+            version, state = record["version"], record["state"]
+        elif record["base"] == version:
+            version, state = record["version"], apply_delta(state, record["delta"])
+    connection.close()
+    results.append((version, state, messages))
+
+
+async def run(count: int, backend: SimulationBackend, http: AsyncHTTPClient):
+    base = f"http://localhost:{PORT}"
+    stop, results = asyncio.Event(), []
+    clients = [asyncio.create_task(subscriber(f"ws://localhost:{PORT}/ws", stop, results)) for _ in range(count)]
+    await asyncio.sleep(DURATION)
+
+    rng = random.Random(0)
+    batches = [make_batch(50, rng) for _ in range(20)]
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        http.fetch(f"{base}/optimize", method="POST", body=json.dumps({"batch": batches[i % len(batches)]}))
+        for i in range(OPTIMIZE_REQUESTS)
+    ])
+    optimize_s = time.perf_counter() - start
+
+    # Let the last version reach every subscriber before comparing
+    backend.stop()
+    await asyncio.sleep(1.0)
+    stop.set()
+    await asyncio.gather(*clients)
+    data = json.loads((await http.fetch(f"{base}/data")).body)
+    health = json.loads((await http.fetch(f"{base}/health")).body)
+    consistent = sum(1 for version, state, _ in results if version == data["version"] and state == data["state"])
+    return {
+        "messages": sum(messages for _, _, messages in results) / count,
+        "consistent": consistent,
+        "optimize_s": optimize_s,
+        "solves": health["optimize_solves"],
+    }
+
+
+async def main():
+    print(f"{'subscribers':>11} {'msgs/sub':>9} {'in sync':>8} {'optimize {0} req'.format(OPTIMIZE_REQUESTS):>18} {'solves':>7}")
+    http = AsyncHTTPClient(max_clients=OPTIMIZE_REQUESTS)
+    for count in SUBSCRIBER_COUNTS:
+        backend = SimulationBackend(interval=TICK_INTERVAL)
+        app = make_app(backend=backend, stream=DeltaStream(), batcher=OptimizeBatcher())
+        app.settings["stream"].start()
+        server = app.listen(PORT)
+        with contextlib.redirect_stdout(io.StringIO()):
+            backend.start()
+            result = await run(count, backend, http)
+        server.stop()
+        app.settings["stream"].stop()
+        app.settings["pool"].shutdown()
+        print(f"{count:>11} {result['messages']:>9.1f} {result['consistent']:>5}/{count:<3}"
+              f"{result['optimize_s'] * 1000:>15.1f} ms {result['solves']:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
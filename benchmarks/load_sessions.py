@@ -0,0 +1,59 @@
+"""Load test: simulation CPU as dashboard sessions go from 1 to 50
+
+Each simulated session is a thread doing what a dashboard rerun does: wait
+for a new state version, then read every field of the snapshot. Simulation
+CPU per tick should stay flat because all sessions share one backend. Run
+from the repository root:
+
+    python -m benchmarks.load_sessions
+"""
+import contextlib
+import io
+import threading
+import time
+
+from simulation import SimulationBackend, state_bus
+
+SESSION_COUNTS = [1, 5, 10, 25, 50]
+TICK_INTERVAL = 0.05  # seconds; much faster than the dashboard so the test is short
+DURATION = 3.0        # seconds per session count
+
+
+def session(stop: threading.Event, reads: list):
+    """One viewer: re-render whenever a new version is published"""
+    version = 0
+    while not stop.is_set():
+        snapshot = state_bus.wait_for_version(version, timeout=0.5)
+        if snapshot is None:
+            continue
+        version = snapshot.version
+        for train in snapshot.data["active_trains"]:
+            f"{train['name']} ({train['type']}) on {train['route']}"
+        reads.append(version)
+
+
+def main():
+    print(f"{'sessions':>9} {'ticks':>6} {'sim CPU ms/tick':>16} {'renders':>8}")
+    with contextlib.redirect_stdout(io.StringIO()) as quiet:
+        results = []
+        for count in SESSION_COUNTS:
+            backend = SimulationBackend(interval=TICK_INTERVAL)
+            stop, reads = threading.Event(), []
+            viewers = [threading.Thread(target=session, args=(stop, reads)) for _ in range(count)]
+            for viewer in viewers:
+                viewer.start()
+            backend.start()
+            time.sleep(DURATION)
+            backend.stop()
+            stop.set()
+            for viewer in viewers:
+                viewer.join()
+            health = backend.health()
+            results.append((count, health["ticks"], health["cpu_per_tick_ms"], len(reads)))
+            quiet.truncate(0)
+    for count, ticks, cpu_per_tick, renders in results:
+        print(f"{count:>9} {ticks:>6} {cpu_per_tick:>16.3f} {renders:>8}")
+
+
+if __name__ == "__main__":
+    main()
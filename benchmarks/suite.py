@@ -0,0 +1,221 @@
+"""Time and memory of every dashboard and simulation hot path at 25 to 100k trains
+
+Each case is timed over several runs (median and best) and then run once
+more under tracemalloc for its peak allocation. Results are written as JSON
+and compared against a stored baseline; any case slower than the baseline by
+more than the threshold is reported and makes the run exit non-zero. The
+baseline in benchmarks/baseline.json is committed, generated at FLEET_SIZES;
+CI compares against it at 25 and 1000 trains. Run from the repository root:
+
+    python -m benchmarks.suite                          # run and compare with the baseline
+    python -m benchmarks.suite --sizes 25,1000          # a quicker subset
+    python -m benchmarks.suite --update-baseline        # accept the current numbers
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import simulation
+from benchmarks.bench_precedence import make_batch
+from utils.data_generator import TrainDataGenerator
+from utils.network_map import NetworkMap
+from utils.spatial_index import spatial_index
+from utils.state_publisher import StatePublisher
+from utils.stations import STATION_COORDS
+from utils.train_controller import TrainController, trains_near
+
+FLEET_SIZES = [25, 1_000, 10_000, 100_000]
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+RESULTS_PATH = "benchmark_results.json"
+REGRESSION_THRESHOLD = 1.5  # slower than baseline by this factor counts as a regression
+NOISE_FLOOR_MS = 0.05       # differences below this are timer noise, not regressions
+TIME_BUDGET_S = 1.0         # per case, split over the timed runs
+
+
+def build_cases(size: int, workdir: str) -> List[Tuple[str, Callable[[], Callable[[], Any]]]]:
+    """(name, setup) pairs; setup prepares the state and returns the callable to measure
+
+    A setup can instead return a (prepare, run) pair: `prepare` is called
+    before every run, outside the timed region.
+    """
+    network_map = NetworkMap()
+    generator = TrainDataGenerator(num_trains=size, seed=0, route_graph=network_map.graph)
+    controller = TrainController(route_graph=network_map.graph)
+    rng = random.Random(0)
+
+    def update_trains():
+        return generator.update_trains
+
+    def get_trains_dataframe():
+        # One fleet update between builds, as on the dashboard; only the build is timed
+        generator.get_trains_dataframe()
+        return generator.update_trains, generator.get_trains_dataframe
+
+    def create_network_figure():
+        network_map.create_network_figure(generator.trains)
+        return lambda: network_map.create_network_figure(generator.trains)
+
+    def optimize():
+        batch = make_batch(size, rng)
+        return lambda: simulation.optimize(batch)
+
+    def save_state():
+        simulation.publisher = StatePublisher(os.path.join(workdir, f"state-{size}.json"))
+        events = make_batch(size, rng)
+        simulation.save_state({"active_trains": events, "recommendations": [], "track_status": {}})
+
+        def run():
+            # A few trains change per tick, like the live simulation
+            # (as new dicts: the publisher diffs against the events it last saw)
+            for i in rng.sample(range(size), min(5, size)):
+                events[i] = dict(events[i], delay=rng.choice([0, 5, 10, 15]))
+            simulation.save_state({"active_trains": events, "recommendations": events[:3], "track_status": {}})
+        return run
+
+    def generate_recommendations():
+        return lambda: controller.generate_recommendations(generator.trains)
+
+    def calculate_metrics():
+        # The metrics follow the fleet's changes, so update it between runs; only the read is timed
+        controller.calculate_metrics(generator.trains)
+        return generator.update_trains, lambda: controller.calculate_metrics(generator.trains)
+
+    def trains_near_station():
+        spatial_index(generator.trains)  # built once, then kept current by the fleet
+        station = STATION_COORDS["Vijayawada"]
+        return lambda: trains_near(generator.trains, station["lat"], station["lon"])
+
+    def detect_conflicts():
+        return lambda: controller.detect_conflicts(generator.trains, limit=10)
+
+    return [
+        ("update_trains", update_trains),
+        ("get_trains_dataframe", get_trains_dataframe),
+        ("create_network_figure", create_network_figure),
+        ("optimize", optimize),
+        ("save_state", save_state),
+        ("generate_recommendations", generate_recommendations),
+        ("calculate_metrics", calculate_metrics),
+        ("trains_near_station", trains_near_station),
+        ("detect_conflicts", detect_conflicts),
+    ]
+
+
+def measure(setup: Callable[[], Callable[[], Any]], max_runs: int) -> Dict[str, float]:
+    """Median/best time of a case and its peak traced allocation"""
+    case = setup()
+    prepare, run = case if isinstance(case, tuple) else (lambda: None, case)
+    prepare()
+    start = time.perf_counter()
+    run()  # warm-up, also sizes the number of timed runs
+    first = time.perf_counter() - start
+    runs = max(3, min(max_runs, int(TIME_BUDGET_S / max(first, 1e-6))))
+    times = []
+    for _ in range(runs):
+        prepare()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    prepare()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "min_ms": min(times) * 1000,
+        "runs": runs,
+        "peak_kb": peak / 1024,
+    }
+
+
+def run_suite(sizes: List[int], only: List[str] | None = None, max_runs: int = 50) -> Dict[str, Any]:
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            for name, setup in build_cases(size, workdir):
+                if only and name not in only:
+                    continue
+                key = f"{name}/{size}"
+                results[key] = measure(setup, max_runs)
+                r = results[key]
+                print(f"{key:<34} {r['median_ms']:>10.3f} ms  (best {r['min_ms']:.3f}, "
+                      f"{r['runs']} runs)  peak {r['peak_kb']:>10.1f} KB", flush=True)
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print current vs baseline per case and return the cases that regressed"""
+    regressions = []
+    print(f"\n{'case':<34} {'baseline ms':>12} {'now ms':>10} {'ratio':>7}")
+    for key, now in results["results"].items():
+        before = baseline["results"].get(key)
+        if before is None:
+            print(f"{key:<34} {'-':>12} {now['median_ms']:>10.3f} {'new':>7}")
+            continue
+        ratio = now["median_ms"] / max(before["median_ms"], 1e-9)
+        regressed = ratio > threshold and now["median_ms"] - before["median_ms"] > NOISE_FLOOR_MS
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<34} {before['median_ms']:>12.3f} {now['median_ms']:>10.3f} {ratio:>6.2f}x"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, FLEET_SIZES)), help="comma-separated fleet sizes")
+    parser.add_argument("--only", default=None, help="comma-separated case names to run")
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write this run's results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--update-baseline", action="store_true", help="save this run as the new baseline")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run_suite(sizes, args.only.split(",") if args.only else None)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold}x: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
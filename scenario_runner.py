@@ -0,0 +1,129 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any
+
+import numpy as np
+
+from simulation import DaySimulation, DAY_SECONDS, optimize, make_fleet
+
+# ------------------------
+# Dispatch Policies
+# ------------------------
+def fifo(batch):
+    # First come, first served
+    return sorted(batch, key=lambda e: e["time"])
+
+def priority_only(batch):
+    # Higher priority first, ignoring delay
+    return sorted(batch, key=lambda e: (-e["priority"], e["time"]))
+
+POLICIES = {
+    "optimize": optimize,
+    "fifo": fifo,
+    "priority": priority_only
+}
+
+METRICS = ["avg_delay", "p95_delay", "throughput", "utilization"]
+
+# ------------------------
+# Scenarios
+# ------------------------
+def random_disruptions(seed: int, fleet_size: int, delays: int = 0, breakdowns: int = 0,
+                       duration: float = DAY_SECONDS) -> List[Dict[str, Any]]:
+    """Deterministic set of injected delays and breakdowns"""
+    rng = random.Random(seed)
+    disruptions = []
+    for kind, count, minutes in (("delay", delays, (10, 30)), ("breakdown", breakdowns, (20, 60))):
+        for _ in range(count):
+            disruptions.append({
+                "at": rng.uniform(0, duration),
+                "kind": kind,
+                "train": rng.randrange(fleet_size),
+                "minutes": rng.randint(*minutes)
+            })
+    return disruptions
+
+def build_scenarios(num_seeds: int, policies: List[str], base_seed: int = 0, fleet_size: int = 100,
+                    delays: int = 0, breakdowns: int = 0) -> List[Dict[str, Any]]:
+    """Every policy against the same seeded disruption sets
+
+    Seeds are spawned from `base_seed`, so a batch is reproducible and each
+    policy sees identical traffic and disruptions for a given seed.
+    """
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(base_seed).spawn(num_seeds)]
+    return [
+        {
+            "name": f"{policy}/seed-{seed}",
+            "seed": seed,
+            "policy": policy,
+            "fleet_size": fleet_size,
+            "disruptions": random_disruptions(seed, fleet_size, delays, breakdowns)
+        }
+        for seed in seeds
+        for policy in policies
+    ]
+
+def run_scenario(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one scenario headless and return its compact metrics"""
+    start = time.perf_counter()
+    metrics = DaySimulation(
+        fleet=make_fleet(scenario["fleet_size"]),
+        seed=scenario["seed"],
+        policy=POLICIES[scenario["policy"]],
+        disruptions=scenario["disruptions"]
+    ).run()
+    result = {key: scenario[key] for key in ("name", "seed", "policy")}
+    result.update({metric: metrics[metric] for metric in METRICS})
+    result["runtime_s"] = time.perf_counter() - start
+    return result
+
+def run_scenarios(scenarios: List[Dict[str, Any]], workers: int | None = None) -> List[Dict[str, Any]]:
+    """Fan scenarios out over a process pool; results come back in scenario order"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [run_scenario(scenario) for scenario in scenarios]
+    # A few scenarios per task keeps pickling overhead low without starving workers
+    chunksize = max(1, len(scenarios) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_scenario, scenarios, chunksize=chunksize))
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Mean of each metric per policy"""
+    summary = {}
+    for policy in dict.fromkeys(result["policy"] for result in results):
+        rows = [result for result in results if result["policy"] == policy]
+        summary[policy] = {metric: float(np.mean([row[metric] for row in rows])) for metric in METRICS}
+        summary[policy]["scenarios"] = len(rows)
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run what-if disruption scenarios in parallel")
+    parser.add_argument("--seeds", type=int, default=20)
+    parser.add_argument("--policies", nargs="+", default=list(POLICIES), choices=list(POLICIES))
+    parser.add_argument("--fleet-size", type=int, default=100)
+    parser.add_argument("--delays", type=int, default=20, help="injected delays per scenario")
+    parser.add_argument("--breakdowns", type=int, default=5, help="injected breakdowns per scenario")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--scaling", action="store_true", help="time the batch at 1, 2, 4 ... workers")
+    args = parser.parse_args()
+
+    scenarios = build_scenarios(args.seeds, args.policies, fleet_size=args.fleet_size,
+                                delays=args.delays, breakdowns=args.breakdowns)
+    if args.scaling:
+        counts = sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i <= (os.cpu_count() or 1)], os.cpu_count() or 1})
+        baseline = None
+        for workers in counts:
+            start = time.perf_counter()
+            run_scenarios(scenarios, workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>3} workers: {elapsed:7.2f}s  speedup {baseline / elapsed:4.2f}x")
+    else:
+        start = time.perf_counter()
+        results = run_scenarios(scenarios, args.workers)
+        print(f"{len(results)} scenarios in {time.perf_counter() - start:.2f}s")
+        for policy, metrics in summarize(results).items():
+            print(f"{policy:>10}: " + "  ".join(f"{metric} {metrics[metric]:.1f}" for metric in METRICS))
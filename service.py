@@ -0,0 +1,346 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any
+
+import tornado.web
+import tornado.websocket
+from tornado.iostream import StreamClosedError
+
+from scenario_runner import POLICIES, random_disruptions, run_scenario
+from simulation import TICK_INTERVAL, get_backend, optimize, state_bus
+from utils.state_bus import StateBus, thaw
+from utils.state_publisher import diff_state
+
+def encode(data: Any) -> str:
+    """Compact JSON, as in the state files"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+# ------------------------
+# Delta Streaming
+# ------------------------
+SUBSCRIBER_QUEUE = 32  # messages a slow subscriber may fall behind before it is resynced
+
+class Subscriber:
+    """One stream client: a bounded queue of encoded messages"""
+
+    def __init__(self, maxsize: int = SUBSCRIBER_QUEUE):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.resyncs = 0
+
+    async def next(self) -> str:
+        return await self.queue.get()
+
+class DeltaStream:
+    """Fans the state bus out to stream subscribers as per-tick deltas
+
+    One task follows the bus; each new version is diffed against the last
+    and encoded once, then queued for every subscriber. A subscriber starts
+    with a full snapshot (``{"version", "state"}``) and then receives
+    ``{"version", "base", "delta"}`` records, the same format as the state
+    files. A subscriber whose queue is full is dropped back to a fresh
+    snapshot instead of holding up the others.
+    """
+
+    def __init__(self, bus: StateBus = state_bus, queue_size: int = SUBSCRIBER_QUEUE):
+        self.bus = bus
+        self.queue_size = queue_size
+        self.subscribers: set = set()
+        self.version = 0
+        self.state: Dict[str, Any] = {}
+        self._snapshot_message: str | None = None
+        self._task: asyncio.Task | None = None
+
+    def snapshot_message(self) -> str:
+        if self._snapshot_message is None:
+            self._snapshot_message = encode({"version": self.version, "state": self.state})
+        return self._snapshot_message
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        subscriber.queue.put_nowait(self.snapshot_message())
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def _advance(self, version: int, state: Dict[str, Any]):
+        """Move to a new version and queue its delta for every subscriber"""
+        delta = diff_state(self.state, state)
+        message = encode({"version": version, "base": self.version, "delta": delta})
+        self.version, self.state = version, state
+        self._snapshot_message = None
+        for subscriber in self.subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind: discard its backlog and start it over from a snapshot
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(self.snapshot_message())
+                subscriber.resyncs += 1
+
+    async def _follow(self):
+        loop = asyncio.get_running_loop()
+        snapshot = self.bus.latest()
+        self.version, self.state = snapshot.version, thaw(snapshot.data)
+        while True:
+            # Waiting happens on a worker thread; the event loop stays free
+            snapshot = await loop.run_in_executor(None, self.bus.wait_for_version, self.version, 1.0)
+            if snapshot is not None:
+                self._advance(snapshot.version, thaw(snapshot.data))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._follow())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+# ------------------------
+# Optimize Batching
+# ------------------------
+BATCH_WINDOW = 0.005  # seconds an optimize request waits for others to share its solve
+MAX_BATCH = 64
+
+def _solve_all(batches: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]] | Exception]:
+    """A plan per batch, or the exception solving it raised, so one bad batch fails only its own requests"""
+    results = []
+    for batch in batches:
+        try:
+            results.append(optimize(batch))
+        except Exception as e:
+            results.append(e)
+    return results
+
+class OptimizeBatcher:
+    """Collects concurrent optimize requests and solves them in one worker call
+
+    Requests arriving within `window` seconds of each other (up to
+    `max_batch`) are handed to a worker thread together, and identical
+    batches are solved only once.
+    """
+
+    def __init__(self, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[tuple] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self.solves = 0
+        self.requests = 0
+
+    async def optimize(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((encode(batch), batch, future))
+        self.requests += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            asyncio.get_running_loop().create_task(self._solve(pending))
+
+    async def _solve(self, pending: List[tuple]):
+        unique = {key: batch for key, batch, _ in pending}
+        self.solves += len(unique)
+        try:
+            plans = await asyncio.get_running_loop().run_in_executor(None, _solve_all, list(unique.values()))
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        by_key = dict(zip(unique, plans))
+        for key, _, future in pending:
+            if future.done():
+                continue
+            if isinstance(by_key[key], Exception):
+                future.set_exception(by_key[key])
+            else:
+                future.set_result(by_key[key])
+
+# ------------------------
+# HTTP / WebSocket Handlers
+# ------------------------
+REQUIRED_FIELDS = ("id", "route", "priority", "delay", "scheduled")
+NUMERIC_FIELDS = ("priority", "delay", "scheduled")
+
+def _number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def valid_event(event: Any) -> bool:
+    """A train the optimizer can rank: every required field, with numbers where it compares them,
+    a string or integer id and a string route (and type, if given)"""
+    return (isinstance(event, dict) and all(field in event for field in REQUIRED_FIELDS)
+            and all(_number(event[field]) for field in NUMERIC_FIELDS)
+            and isinstance(event["id"], (str, int)) and not isinstance(event["id"], bool)
+            and isinstance(event["route"], str) and isinstance(event.get("type", ""), str))
+
+def valid_batch(batch: Any) -> bool:
+    """A list of valid trains whose ids are all of one type, so ties between them can be ordered"""
+    return (isinstance(batch, list) and all(valid_event(event) for event in batch)
+            and len({type(event["id"]) for event in batch}) <= 1)
+
+class BaseHandler(tornado.web.RequestHandler):
+    def write_json(self, data: Any):
+        self.set_header("Content-Type", "application/json")
+        self.finish(encode(data))
+
+    def json_body(self) -> Dict[str, Any]:
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Body is not valid JSON")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Body must be a JSON object")
+        return body
+
+class DataHandler(BaseHandler):
+    """GET /data: the latest published state"""
+
+    def get(self):
+        snapshot = state_bus.latest()
+        self.write_json({"version": snapshot.version, "state": thaw(snapshot.data)})
+
+class OptimizeHandler(BaseHandler):
+    """POST /optimize {"batch": [...]}: the batch in release order with decisions"""
+
+    async def post(self):
+        batch = self.json_body().get("batch")
+        if not valid_batch(batch):
+            raise tornado.web.HTTPError(400, reason=f"batch must be a list of trains with {', '.join(REQUIRED_FIELDS)}; "
+                                                    f"{', '.join(NUMERIC_FIELDS)} numeric, id a string or integer "
+                                                    f"(one kind per batch), route and type strings")
+        self.write_json({"plan": await self.application.settings["batcher"].optimize(batch)})
+
+class SimulateHandler(BaseHandler):
+    """POST /simulate {"seed", "policy", "fleet_size", "delays", "breakdowns"}: metrics of a simulated day"""
+
+    async def post(self):
+        body = self.json_body()
+        try:
+            seed = int(body.get("seed", 0))
+            fleet_size = int(body.get("fleet_size", 100))
+            delays, breakdowns = int(body.get("delays", 0)), int(body.get("breakdowns", 0))
+        except (TypeError, ValueError):
+            raise tornado.web.HTTPError(400, reason="seed, fleet_size, delays and breakdowns must be integers")
+        policy = body.get("policy", "optimize")
+        if policy not in POLICIES:
+            raise tornado.web.HTTPError(400, reason=f"policy must be one of {', '.join(POLICIES)}")
+        if not 0 < fleet_size <= self.application.settings["max_fleet_size"]:
+            raise tornado.web.HTTPError(400, reason="fleet_size out of range")
+        if not (0 <= delays <= fleet_size and 0 <= breakdowns <= fleet_size):
+            raise tornado.web.HTTPError(400, reason="delays and breakdowns must be between 0 and fleet_size")
+        scenario = {
+            "name": f"{policy}/seed-{seed}",
+            "seed": seed,
+            "policy": policy,
+            "fleet_size": fleet_size,
+            "disruptions": random_disruptions(seed, fleet_size, delays, breakdowns)
+        }
+        # A day simulation is CPU-bound; run it on the process pool
+        pool = self.application.settings["pool"]
+        self.write_json(await asyncio.get_running_loop().run_in_executor(pool, run_scenario, scenario))
+
+class HealthHandler(BaseHandler):
+    """GET /health: backend liveness, subscribers and optimize batching"""
+
+    def get(self):
+        settings = self.application.settings
+        self.write_json(dict(
+            settings["backend"].health(),
+            subscribers=len(settings["stream"].subscribers),
+            optimize_requests=settings["batcher"].requests,
+            optimize_solves=settings["batcher"].solves
+        ))
+
+class EventStreamHandler(tornado.web.RequestHandler):
+    """GET /stream: server-sent events, one per state version"""
+
+    async def get(self):
+        stream: DeltaStream = self.application.settings["stream"]
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        subscriber = stream.subscribe()
+        try:
+            while True:
+                self.write(f"data: {await subscriber.next()}\n\n")
+                await self.flush()
+        except StreamClosedError:
+            pass
+        finally:
+            stream.unsubscribe(subscriber)
+
+class DeltaSocketHandler(tornado.websocket.WebSocketHandler):
+    """WS /ws: one message per state version"""
+
+    def open(self):
+        stream: DeltaStream = self.application.settings["stream"]
+        self.subscriber = stream.subscribe()
+        self.pump = asyncio.get_running_loop().create_task(self._pump())
+
+    async def _pump(self):
+        try:
+            while True:
+                await self.write_message(await self.subscriber.next())
+        except tornado.websocket.WebSocketClosedError:
+            pass
+
+    def on_close(self):
+        self.application.settings["stream"].unsubscribe(self.subscriber)
+        self.pump.cancel()
+
+def make_app(backend=None, stream: DeltaStream | None = None, batcher: OptimizeBatcher | None = None,
+             pool: ProcessPoolExecutor | None = None, max_fleet_size: int = 10_000) -> tornado.web.Application:
+    """The service's routes around a simulation backend (the shared one by default)
+
+    Scenario runs go to `pool`, or to a new process pool; its workers start
+    on the first /simulate request, and the caller shuts it down.
+    """
+    return tornado.web.Application([
+        (r"/data", DataHandler),
+        (r"/optimize", OptimizeHandler),
+        (r"/simulate", SimulateHandler),
+        (r"/health", HealthHandler),
+        (r"/stream", EventStreamHandler),
+        (r"/ws", DeltaSocketHandler),
+    ], backend=backend or get_backend(), stream=stream or DeltaStream(), batcher=batcher or OptimizeBatcher(),
+       pool=pool or ProcessPoolExecutor(), max_fleet_size=max_fleet_size)
+
+async def serve(port: int, **backend_options):
+    """Run the simulation backend and serve it on `port` until cancelled"""
+    app = make_app(backend=get_backend(**backend_options))
+    app.settings["stream"].start()
+    server = app.listen(port)
+    print(f"🚉 Service listening on http://localhost:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+        app.settings["stream"].stop()
+        app.settings["backend"].stop(timeout=1)
+        app.settings["pool"].shutdown(cancel_futures=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP/WebSocket service around the simulation and optimizer")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--interval", type=float, default=TICK_INTERVAL, help="seconds between simulation cycles")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--replay", metavar="PATH", help="serve a recorded event stream instead of simulating")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port, interval=args.interval, seed=args.seed, replay=args.replay))
+    except KeyboardInterrupt:
+        pass
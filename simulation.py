@@ -1,103 +1,588 @@
-import random
-import time
-import json
-from datetime import datetime
-
-# ------------------------
-# Train Data
-# ------------------------
-trains = [
-    {"id": "01101", "name": "Mumbai LTT - Gwalior (Weekly) Special"},
-    {"id": "12951", "name": "Mumbai Rajdhani Express"},
-    {"id": "22209", "name": "Mumbai Duronto Express"},
-    {"id": "12009", "name": "Mumbai Shatabdi Express"},
-    {"id": "19019", "name": "Mumbai Dehradun Express"}
-]
-
-routes = ["North", "South", "East", "West"]
-
-train_priorities = {
-    "Mumbai Rajdhani Express": 3,
-    "Mumbai Duronto Express": 3,
-    "Mumbai Shatabdi Express": 2,
-    "Mumbai LTT - Gwalior (Weekly) Special": 2,
-    "Mumbai Dehradun Express": 1
-}
-
-# ------------------------
-# Shared State for Dashboard
-# ------------------------
-state = {
-    "active_trains": [],
-    "recommendations": [],
-    "track_status": {}
-}
-
-# ------------------------
-# Optimizer
-# ------------------------
-def optimize(batch):
-    # Higher priority first, then higher delay, then earlier scheduled time
-    sorted_events = sorted(
-        batch,
-        key=lambda e: (e["priority"], e["delay"], -e["scheduled"]),
-        reverse=True
-    )
-    return sorted_events
-
-# ------------------------
-# Save state for dashboard
-# ------------------------
-def save_state(state):
-    with open("state.json", "w") as f:
-        json.dump(state, f, indent=2)
-
-# ------------------------
-# Simulation Loop
-# ------------------------
-def run_simulation():
-    print("🔄 Train simulation started...")
-    while True:
-        batch = []
-        active = []
-        track_status = {}
-
-        for train in trains:
-            event_type = random.choice(["Arrival", "Departure"])
-            route = random.choice(routes)
-            delay = random.choice([0, 5, 10, 15])
-            scheduled_time = random.randint(1, 100)
-
-            event = {
-                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "id": train["id"],
-                "name": train["name"],
-                "type": event_type,
-                "route": route,
-                "priority": train_priorities.get(train["name"], 1),
-                "delay": delay,
-                "scheduled": scheduled_time
-            }
-
-            active.append(event)
-            track_status[train["name"]] = "Delayed" if delay > 0 else "On Time"
-
-            if event_type == "Arrival":
-                batch.append(event)
-
-        # Optimizer: get top 3 recommendations
-        recommendations = optimize(batch)[:3] if batch else []
-
-        # Update shared state
-        state["active_trains"] = active
-        state["recommendations"] = recommendations
-        state["track_status"] = track_status
-
-        # ✅ Save state so Streamlit can read it
-        save_state(state)
-
-        print("Updated state at", datetime.now().strftime("%H:%M:%S"))
-        time.sleep(5)  # every 5 seconds new cycle
-
-if __name__ == "__main__":
-    run_simulation()
+import argparse
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Callable
+
+import numpy as np
+
+from utils.event_engine import EventEngine
+from utils.event_log import EventRecorder, EventReplayer
+from utils.metrics_engine import EventWindow
+from utils.precedence import PrecedenceOptimizer, precedence_key
+from utils.priority_queue import IndexedHeap
+from utils.profiling import TickProfiler
+from utils.state_publisher import StatePublisher
+from utils.state_bus import StateBus
+from utils.tick_scheduler import OVERRUN_POLICIES, SKIP, TickScheduler
+
+# ------------------------
+# Train Data
+# ------------------------
+trains = [
+    {"id": "01101", "name": "Mumbai LTT - Gwalior (Weekly) Special"},
+    {"id": "12951", "name": "Mumbai Rajdhani Express"},
+    {"id": "22209", "name": "Mumbai Duronto Express"},
+    {"id": "12009", "name": "Mumbai Shatabdi Express"},
+    {"id": "19019", "name": "Mumbai Dehradun Express"}
+]
+
+routes = ["North", "South", "East", "West"]
+
+train_priorities = {
+    "Mumbai Rajdhani Express": 3,
+    "Mumbai Duronto Express": 3,
+    "Mumbai Shatabdi Express": 2,
+    "Mumbai LTT - Gwalior (Weekly) Special": 2,
+    "Mumbai Dehradun Express": 1
+}
+
+# Where each base train runs on the dashboard's network (from, to), for reroutes.
+# Termini off the network map to the last network station on the way; the
+# Shatabdi runs to Ahmedabad, which has none, so it has no stations.
+train_stations = {
+    "Mumbai Rajdhani Express": ("Mumbai Central", "New Delhi"),
+    "Mumbai Duronto Express": ("Mumbai Central", "New Delhi"),
+    "Mumbai LTT - Gwalior (Weekly) Special": ("Mumbai Central", "New Delhi"),
+    "Mumbai Dehradun Express": ("Mumbai Central", "New Delhi")
+}
+
+def make_fleet(size: int) -> List[Dict[str, str]]:
+    """A fleet of `size` trains, cycling through the base trains (keeps their priorities)"""
+    return [
+        {"id": f"{trains[i % len(trains)]['id']}-{i}", "name": trains[i % len(trains)]["name"]}
+        for i in range(size)
+    ]
+
+# ------------------------
+# Shared State for Dashboard
+# ------------------------
+# Immutable, versioned snapshots; the dashboard reads whole versions only
+state_bus = StateBus({
+    "active_trains": [],
+    "recommendations": [],
+    "track_status": {}
+})
+
+# Arrivals and departures over the last hour, for throughput
+movements = EventWindow()
+
+# ------------------------
+# Optimizer
+# ------------------------
+def optimize(batch):
+    # Trains sharing a segment enter one at a time, respecting occupancy and headway.
+    # Precedence: higher priority first, then higher delay, then earlier scheduled time.
+    # Returns the batch in release order, annotated with Hold/Proceed decisions.
+    return PrecedenceOptimizer().solve(batch)
+
+# Live plan for the dashboard, re-solved incrementally as trains change
+precedence = PrecedenceOptimizer()
+
+# Arriving trains keyed by precedence; the top k are the recommendations
+recommendation_queue = IndexedHeap()
+RECOMMENDATIONS = 3
+
+# ------------------------
+# Save state for dashboard
+# ------------------------
+publisher = StatePublisher("state.json")
+
+def save_state(state):
+    # Atomic compact snapshots every few cycles, small deltas in between
+    return publisher.publish(state)
+
+# ------------------------
+# Simulation Loop
+# ------------------------
+TICK_INTERVAL = 5  # seconds between dashboard cycles
+
+# Time per phase of every cycle; a cycle longer than its interval is an overrun
+profiler = TickProfiler(budget_s=TICK_INTERVAL)
+
+def draw_tick(rng=random, fleet: List[Dict[str, str]] | None = None) -> List[Dict[str, Any]]:
+    """Draw one cycle of random train events for `fleet` (the base trains) from `rng`"""
+    events = []
+    for train in fleet or trains:
+        event_type = rng.choice(["Arrival", "Departure"])
+        route = rng.choice(routes)
+        delay = rng.choice([0, 5, 10, 15])
+        scheduled_time = rng.randint(1, 100)
+
+        events.append({
+            "id": train["id"],
+            "name": train["name"],
+            "type": event_type,
+            "route": route,
+            "priority": train_priorities.get(train["name"], 1),
+            "delay": delay,
+            "scheduled": scheduled_time
+        })
+    return events
+
+def with_stations(event: Dict[str, Any]) -> Dict[str, Any]:
+    """The event with its train's current station and destination on the network, if it has them"""
+    stations = train_stations.get(event.get("name"))
+    if stations is None:
+        return event
+    return dict(event, current_station=stations[0], destination=stations[1])
+
+class Region:
+    """One independent simulation: its own trains, optimizer, metrics and state
+
+    A region draws its events from its own generator and keeps its own
+    precedence plan, recommendation heap, movement window, state bus and
+    profiler, so many regions can tick in one process without sharing
+    anything. `save` is called with every published state, e.g. to write it
+    to disk. A movement is counted only when a train's event changes from
+    arrival to departure or back, not every time it is redrawn.
+    """
+
+    def __init__(self, name: str, fleet: List[Dict[str, str]] | None = None, seed: int | None = None,
+                 bus: StateBus | None = None, movements: EventWindow | None = None,
+                 precedence: PrecedenceOptimizer | None = None, queue: IndexedHeap | None = None,
+                 save: Callable[[Dict[str, Any]], Any] | None = None, profiler: TickProfiler | None = None):
+        self.name = name
+        self.fleet = fleet or trains
+        self.rng = random.Random(seed)
+        self.state_bus = bus or StateBus({"active_trains": [], "recommendations": [], "track_status": {}})
+        self.movements = movements or EventWindow()
+        self.last_movement: Dict[Any, str] = {}
+        self.precedence = precedence or PrecedenceOptimizer()
+        self.recommendation_queue = queue or IndexedHeap()
+        self.save = save
+        self.profiler = profiler or TickProfiler(budget_s=TICK_INTERVAL)
+
+    def tick(self) -> Dict[str, Any]:
+        """Draw and apply one cycle"""
+        with self.profiler.tick():
+            with self.profiler.phase("draw"):
+                events = draw_tick(self.rng, self.fleet)
+            return self.apply_tick(events)
+
+    def apply_tick(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Feed one cycle of events to the optimizer, metrics and published state"""
+        profiler = self.profiler
+        batch = []
+        active = []
+        track_status = {}
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        with profiler.phase("events"):
+            for event in events:
+                event = {"time": now, **event}
+                active.append(event)
+                if self.last_movement.get(event["id"], event["type"]) != event["type"]:
+                    self.movements.record(event["type"])
+                self.last_movement[event["id"]] = event["type"]
+                track_status[event["name"]] = "Delayed" if event["delay"] > 0 else "On Time"
+
+                if event["type"] == "Arrival":
+                    batch.append(event)
+                    self.recommendation_queue.push(event["id"], precedence_key(event), event["id"])
+                else:
+                    self.recommendation_queue.remove(event["id"])
+
+        # Optimizer: get top 3 recommendations, already in order
+        with profiler.phase("optimize"):
+            self.precedence.sync(batch)
+            recommendations = [
+                self.precedence.decision(train_id) for train_id in self.recommendation_queue.top(RECOMMENDATIONS)
+            ]
+
+        # Publish one complete version of the shared state
+        state = {
+            "active_trains": active,
+            "recommendations": recommendations,
+            "track_status": track_status
+        }
+        with profiler.phase("publish"):
+            self.state_bus.publish(state)
+
+        # ✅ Save state so other processes can read it
+        if self.save is not None:
+            with profiler.phase("save_state"):
+                self.save(state)
+        return state
+
+# The dashboard's region, built on the module-level state above
+region = Region("default", bus=state_bus, movements=movements, precedence=precedence,
+                queue=recommendation_queue, save=save_state, profiler=profiler)
+
+def apply_tick(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Feed one cycle of events to the optimizer, metrics and dashboard state"""
+    return region.apply_tick(events)
+
+def run_simulation(realtime: bool = True, until: float | None = None, stop_event=None,
+                   interval: float = TICK_INTERVAL, on_tick: Callable[[], None] | None = None,
+                   seed: int | None = None, recorder: EventRecorder | None = None,
+                   profile: str | None = None):
+    """Run dashboard cycles every `interval` seconds on the event engine
+
+    Paced to the wall clock by default; with `realtime=False` the cycles up
+    to `until` run back to back. `on_tick` is called after every cycle.
+    A `seed` makes the event stream reproducible, and a `recorder` logs it
+    for `replay_simulation`. Each cycle is timed by `profiler` against the
+    interval, and with `profile` set its summary is saved there every cycle.
+    """
+    print("🔄 Train simulation started...")
+    engine = EventEngine()
+    rng = random.Random(seed) if seed is not None else random
+    profiler.budget_s = interval
+
+    def tick(engine: EventEngine, payload: Dict[str, Any]):
+        with profiler.tick():
+            with profiler.phase("draw"):
+                events = draw_tick(rng)
+                if recorder is not None:
+                    recorder.record(engine.now, events)
+            apply_tick(events)
+        print("Updated state at", datetime.now().strftime("%H:%M:%S"))
+        if profile is not None:
+            profiler.write(profile)
+        if on_tick is not None:
+            on_tick()
+        engine.schedule_in(interval, "tick")  # every 5 seconds new cycle
+
+    engine.on("tick", tick)
+    engine.schedule(0, "tick")
+    engine.run(until=until, realtime=realtime, stop_event=stop_event)
+
+def replay_simulation(path: str, speed: float | None = 1.0, stop_event=None,
+                      on_tick: Callable[[], None] | None = None, profile: str | None = None) -> int:
+    """Feed a recorded event stream back through the optimizer, metrics and dashboard
+
+    `speed` is a multiple of the recorded pace (None replays as fast as
+    possible). Returns the number of ticks replayed. Cycles are profiled as
+    in `run_simulation`.
+    """
+    def tick(at: float, events: List[Dict[str, Any]]):
+        with profiler.tick():
+            apply_tick(events)
+        if profile is not None:
+            profiler.write(profile)
+        if on_tick is not None:
+            on_tick()
+
+    return EventReplayer(path).replay(tick, speed=speed, stop_event=stop_event)
+
+def make_regions(count: int, fleet_size: int = len(trains), seed: int | None = None) -> List[Region]:
+    """`count` independent regions of `fleet_size` trains, seeded from `seed` if given"""
+    return [
+        Region(f"region-{i}", fleet=make_fleet(fleet_size), seed=None if seed is None else seed + i)
+        for i in range(count)
+    ]
+
+async def run_regions(regions: List[Region], interval: float = TICK_INTERVAL, overrun: str = SKIP,
+                      duration: float | None = None, scheduler: TickScheduler | None = None) -> TickScheduler:
+    """Tick every region on fixed `interval` deadlines on one asyncio loop
+
+    Each region is its own scheduler job, so a slow region's overruns are
+    reported (and skipped or caught up per `overrun`) without shifting the
+    cadence of the others. Regions are staggered across the interval so
+    their ticks do not all queue up at once. Runs for `duration` seconds, or
+    until cancelled, and returns the scheduler with its per-region cadence
+    statistics.
+    """
+    scheduler = scheduler or TickScheduler()
+    for i, r in enumerate(regions):
+        r.profiler.budget_s = interval
+        scheduler.add(r.name, r.tick, interval, overrun=overrun, offset=i * interval / len(regions))
+    await scheduler.run(duration)
+    return scheduler
+
+# ------------------------
+# Shared Backend
+# ------------------------
+class SimulationBackend:
+    """Process-wide owner of the simulation thread
+
+    Every dashboard session attaches to the same backend and reads its state
+    from `state_bus`, so opening more sessions adds viewers, not simulators.
+    With `replay` set to a recorded event log, the backend feeds that log
+    back at `replay_speed` instead of drawing new events. `profile` is a
+    file the tick profile is saved to every cycle, and `alloc_sample_every`
+    samples allocations on every n-th cycle.
+    """
+
+    def __init__(self, interval: float = TICK_INTERVAL, seed: int | None = None,
+                 replay: str | None = None, replay_speed: float | None = 1.0,
+                 profile: str | None = None, alloc_sample_every: int | None = None):
+        self.interval = interval
+        self.seed = seed
+        self.replay = replay
+        self.replay_speed = replay_speed
+        self.profile = profile
+        profiler.sample_every = alloc_sample_every
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self.started_at: float | None = None
+        self.ticks = 0
+        self.last_tick_at: float | None = None
+        self.cpu_seconds = 0.0
+        self.error: str | None = None
+
+    def start(self) -> bool:
+        """Start the simulation thread; False if it is already running"""
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self.error = None
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="simulation-backend", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, timeout: float | None = None):
+        """Ask the simulation thread to stop and wait for it"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _record_tick(self):
+        self.ticks += 1
+        self.last_tick_at = time.time()
+        self.cpu_seconds = time.thread_time()  # CPU used by this thread so far
+
+    def _run(self):
+        try:
+            if self.replay:
+                replay_simulation(self.replay, speed=self.replay_speed, stop_event=self._stop,
+                                  on_tick=self._record_tick, profile=self.profile)
+            else:
+                run_simulation(stop_event=self._stop, interval=self.interval, on_tick=self._record_tick,
+                               seed=self.seed, profile=self.profile)
+        except Exception as e:
+            self.error = repr(e)
+            raise
+
+    def health(self) -> Dict[str, Any]:
+        """Liveness and load of the backend"""
+        now = time.time()
+        return {
+            "running": self.running,
+            "ticks": self.ticks,
+            "state_version": state_bus.version,
+            "uptime_s": now - self.started_at if self.started_at else 0.0,
+            "last_tick_age_s": now - self.last_tick_at if self.last_tick_at else None,
+            "cpu_seconds": self.cpu_seconds,
+            "cpu_per_tick_ms": 1000 * self.cpu_seconds / self.ticks if self.ticks else 0.0,
+            "tick_overruns": profiler.overruns,
+            "healthy": self.running and self.error is None and (
+                self.last_tick_at is None or now - self.last_tick_at < 3 * self.interval
+            ),
+            "error": self.error
+        }
+
+_backend: SimulationBackend | None = None
+_backend_lock = threading.Lock()
+
+def get_backend(start: bool = True, **options) -> SimulationBackend:
+    """The process-wide simulation backend, started on first use
+
+    `options` (see SimulationBackend) only apply when the backend is created.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = SimulationBackend(**options)
+        if start:
+            _backend.start()
+        return _backend
+
+# ------------------------
+# Day Simulation
+# ------------------------
+DAY_SECONDS = 24 * 3600
+SECTIONS_PER_TRIP = 4
+SECTION_RUN_TIME = (15 * 60, 30 * 60)  # seconds per section
+DWELL_TIME = 10 * 60                   # turnaround after the junction
+PLATFORM_HEADWAY = 3 * 60              # minimum gap between junction admissions
+DISPATCH_INTERVAL = 60                 # how often the policy orders the queue
+DELAY_RATE = 1 / (2 * 3600)            # random delays per train-second
+BREAKDOWN_RATE = 1 / (12 * 3600)       # random breakdowns per train-second
+
+class DaySimulation:
+    """Discrete-event model of a day of traffic into a shared junction
+
+    Each train runs trips of several sections and then queues for the
+    junction platform. A periodic dispatch event orders the queue with
+    `policy` and admits trains one headway apart, so the policy decides who
+    waits. Random delays and breakdowns are events of their own, and extra
+    `disruptions` ({'at', 'kind', 'train', 'minutes'}) can be injected.
+    """
+
+    def __init__(self, fleet: List[Dict[str, str]] | None = None, seed: int | None = None,
+                 policy: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]] = None,
+                 duration: float = DAY_SECONDS, disruptions: List[Dict[str, Any]] = ()):
+        self.rng = random.Random(seed)
+        self.policy = policy or optimize
+        self.duration = duration
+        self.fleet = [
+            dict(train, priority=train_priorities.get(train["name"], 1), delay=0, hold_until=0.0)
+            for train in (fleet or trains)
+        ]
+        self.queue: List[Dict[str, Any]] = []
+        self.platform_free_at = 0.0
+        self.busy_seconds = 0.0
+        self.delays: List[float] = []
+
+        self.engine = EventEngine()
+        for kind in ("departure", "segment_entry", "arrival", "dispatch", "delay", "breakdown"):
+            self.engine.on(kind, getattr(self, f"_on_{kind}"))
+
+        for index in range(len(self.fleet)):
+            self.engine.schedule(self.rng.uniform(0, 3600), "departure", {"train": index})
+            self._schedule_random("delay", index, DELAY_RATE)
+            self._schedule_random("breakdown", index, BREAKDOWN_RATE)
+        for disruption in disruptions:
+            self.engine.schedule(disruption["at"], disruption["kind"],
+                                 {"train": disruption["train"], "minutes": disruption["minutes"]})
+        self.engine.schedule(DISPATCH_INTERVAL, "dispatch")
+
+    def _schedule_random(self, kind: str, index: int, rate: float):
+        """Schedule the next random delay or breakdown of a train"""
+        at = self.engine.now + self.rng.expovariate(rate)
+        if at < self.duration:
+            minutes = self.rng.choice([5, 10, 15]) if kind == "delay" else self.rng.randint(20, 60)
+            self.engine.schedule(at, kind, {"train": index, "minutes": minutes, "random": True})
+
+    def _held(self, engine: EventEngine, kind: str, payload: Dict[str, Any]) -> bool:
+        """Postpone an event of a broken-down train until it can move again"""
+        hold_until = self.fleet[payload["train"]]["hold_until"]
+        if hold_until > engine.now:
+            engine.schedule(hold_until, kind, payload)
+            return True
+        return False
+
+    def _on_departure(self, engine: EventEngine, payload: Dict[str, Any]):
+        if engine.now < self.duration:
+            route = self.rng.choice(routes)
+            engine.schedule(engine.now, "segment_entry", {"train": payload["train"], "route": route, "section": 0})
+
+    def _on_segment_entry(self, engine: EventEngine, payload: Dict[str, Any]):
+        if self._held(engine, "segment_entry", payload):
+            return
+        run_time = self.rng.uniform(*SECTION_RUN_TIME)
+        if payload["section"] + 1 < SECTIONS_PER_TRIP:
+            engine.schedule_in(run_time, "segment_entry", dict(payload, section=payload["section"] + 1))
+        else:
+            engine.schedule_in(run_time, "arrival", {"train": payload["train"], "route": payload["route"]})
+
+    def _on_arrival(self, engine: EventEngine, payload: Dict[str, Any]):
+        if self._held(engine, "arrival", payload):
+            return
+        train = self.fleet[payload["train"]]
+        self.queue.append({
+            "time": engine.now,
+            "id": train["id"],
+            "name": train["name"],
+            "type": "Arrival",
+            "route": payload["route"],
+            "priority": train["priority"],
+            "delay": train["delay"],
+            "scheduled": engine.now / 60 - train["delay"],
+            "train": payload["train"]
+        })
+
+    def _on_dispatch(self, engine: EventEngine, payload: Dict[str, Any]):
+        for event in self.policy(self.queue) if self.queue else []:
+            admit = max(engine.now, self.platform_free_at)
+            train = self.fleet[event["train"]]
+            self.delays.append(train["delay"] + (admit - event["time"]) / 60)
+            train["delay"] = 0
+            self.platform_free_at = admit + PLATFORM_HEADWAY
+            self.busy_seconds += PLATFORM_HEADWAY
+            engine.schedule(admit + DWELL_TIME, "departure", {"train": event["train"]})
+        self.queue = []
+        if engine.now + DISPATCH_INTERVAL <= self.duration:
+            engine.schedule_in(DISPATCH_INTERVAL, "dispatch")
+
+    def _on_delay(self, engine: EventEngine, payload: Dict[str, Any]):
+        self.fleet[payload["train"]]["delay"] += payload["minutes"]
+        if payload.get("random"):
+            self._schedule_random("delay", payload["train"], DELAY_RATE)
+
+    def _on_breakdown(self, engine: EventEngine, payload: Dict[str, Any]):
+        train = self.fleet[payload["train"]]
+        train["hold_until"] = max(train["hold_until"], engine.now + payload["minutes"] * 60)
+        train["delay"] += payload["minutes"]
+        if payload.get("random"):
+            self._schedule_random("breakdown", payload["train"], BREAKDOWN_RATE)
+
+    def run(self, realtime: bool = False, speed: float = 1.0, stop_event=None) -> Dict[str, float]:
+        """Run the day (as fast as possible unless `realtime`) and return its metrics"""
+        self.engine.run(until=self.duration, realtime=realtime, speed=speed, stop_event=stop_event)
+        return self.metrics()
+
+    def metrics(self) -> Dict[str, float]:
+        """Delay, throughput and junction utilization so far"""
+        elapsed = max(self.engine.now, 1.0)
+        delays = np.array(self.delays) if self.delays else np.zeros(1)
+        return {
+            "avg_delay": float(delays.mean()),
+            "p95_delay": float(np.percentile(delays, 95)),
+            "throughput": len(self.delays) / (elapsed / 3600),
+            "utilization": min(100.0, 100 * self.busy_seconds / elapsed),
+            "arrivals": len(self.delays),
+            "events": self.engine.processed
+        }
+
+def simulate_day(seed: int | None = None, policy=None, realtime: bool = False, speed: float = 1.0,
+                 **kwargs) -> Dict[str, float]:
+    """Simulate one operating day and return its metrics"""
+    return DaySimulation(seed=seed, policy=policy, **kwargs).run(realtime=realtime, speed=speed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train traffic simulation")
+    parser.add_argument("--day", action="store_true", help="simulate a full day as fast as possible and print metrics")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--record", metavar="PATH", help="log the event stream to PATH (.gz to compress)")
+    parser.add_argument("--ticks", type=int, default=None, help="stop after this many cycles, run back to back")
+    parser.add_argument("--replay", metavar="PATH", help="feed a recorded event stream back instead of simulating")
+    parser.add_argument("--speed", default="1", help="replay speed: a multiple such as 1 or 10, or 'max'")
+    parser.add_argument("--profile", metavar="PATH", help="save per-phase tick timings to PATH every cycle")
+    parser.add_argument("--alloc-sample", type=int, default=None, metavar="N",
+                        help="also trace allocations on every N-th cycle")
+    parser.add_argument("--regions", type=int, default=None, metavar="N",
+                        help="run N independent regions on one asyncio loop and print their cadence")
+    parser.add_argument("--fleet-size", type=int, default=len(trains), help="trains per region")
+    parser.add_argument("--interval", type=float, default=TICK_INTERVAL, help="seconds between region cycles")
+    parser.add_argument("--overrun", choices=OVERRUN_POLICIES, default=SKIP,
+                        help="after a late cycle, skip the missed ones or catch up")
+    parser.add_argument("--duration", type=float, default=None, help="seconds to run the regions for")
+    args = parser.parse_args()
+    profiler.sample_every = args.alloc_sample
+    if args.regions:
+        scheduler = asyncio.run(run_regions(make_regions(args.regions, args.fleet_size, args.seed),
+                                            interval=args.interval, overrun=args.overrun, duration=args.duration))
+        for name, stats in scheduler.stats().items():
+            print(f"{name}: {stats['ticks']} ticks, {stats['overruns']} overruns, {stats['skipped']} skipped, "
+                  f"max lateness {stats['max_lateness_ms']:.1f} ms")
+    elif args.day:
+        start = time.perf_counter()
+        print(simulate_day(seed=args.seed))
+        print(f"Simulated a day in {time.perf_counter() - start:.2f}s")
+    elif args.replay:
+        start = time.perf_counter()
+        ticks = replay_simulation(args.replay, speed=None if args.speed == "max" else float(args.speed),
+                                  profile=args.profile)
+        print(f"Replayed {ticks} ticks in {time.perf_counter() - start:.2f}s")
+    else:
+        until = (args.ticks - 1) * TICK_INTERVAL if args.ticks else None
+        recorder = EventRecorder(args.record, seed=args.seed, interval=TICK_INTERVAL) if args.record else None
+        try:
+            run_simulation(realtime=until is None, until=until, seed=args.seed, recorder=recorder,
+                           profile=args.profile)
+        finally:
+            if recorder is not None:
+                recorder.close()
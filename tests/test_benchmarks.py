@@ -0,0 +1,30 @@
+import json
+import tempfile
+
+from benchmarks.suite import BASELINE_PATH, FLEET_SIZES, build_cases, compare
+
+
+def result(median_ms):
+    return {"median_ms": median_ms, "min_ms": median_ms, "runs": 3, "peak_kb": 1.0}
+
+
+class TestBaseline:
+    def test_covers_every_case_at_every_size(self):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with tempfile.TemporaryDirectory() as workdir:
+            names = [name for name, _ in build_cases(25, workdir)]
+
+        missing = [f"{name}/{size}" for size in FLEET_SIZES for name in names
+                   if f"{name}/{size}" not in baseline["results"]]
+
+        assert missing == []
+
+
+class TestCompare:
+    def test_flags_only_slowdowns_beyond_threshold(self):
+        baseline = {"results": {"fast/25": result(10.0), "steady/25": result(10.0), "noise/25": result(0.01)}}
+        results = {"results": {"fast/25": result(20.0), "steady/25": result(12.0), "noise/25": result(0.05),
+                               "new/25": result(1.0)}}
+
+        assert compare(results, baseline, threshold=1.5) == ["fast/25"]
@@ -0,0 +1,40 @@
+from utils.data_generator import TrainDataGenerator
+from utils.metrics_engine import EventWindow
+from utils.train_controller import TrainController
+
+
+class TestThroughput:
+    def make_generator(self):
+        return TrainDataGenerator(num_trains=50, seed=0)
+
+    def test_status_changes_are_not_movements(self):
+        generator = self.make_generator()
+        controller = TrainController()
+        controller.calculate_metrics(generator.trains)
+
+        for _ in range(20):
+            generator.update_trains()
+        controller.simulate_breakdown(generator.trains)
+
+        assert controller.metrics.events.count() == 0
+
+    def test_station_change_is_a_departure_and_an_arrival(self):
+        generator = self.make_generator()
+        controller = TrainController()
+        controller.calculate_metrics(generator.trains)
+        train = generator.trains[0]
+
+        train['current_station'] = train['destination']
+
+        assert controller.metrics.events.count(['Departure']) == 1
+        assert controller.metrics.events.count(['Arrival']) == 1
+
+    def test_simulation_movements_count(self):
+        movements = EventWindow()
+        controller = TrainController(movements=movements)
+        controller.calculate_metrics(self.make_generator().trains)
+
+        movements.record('Arrival')
+        movements.record('Departure')
+
+        assert controller.metrics.events.count() == 2
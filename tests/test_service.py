@@ -0,0 +1,58 @@
+import json
+import random
+
+from tornado.testing import AsyncHTTPTestCase
+
+from benchmarks.bench_precedence import make_batch
+from service import DeltaStream, OptimizeBatcher, make_app
+from simulation import SimulationBackend
+
+
+class OptimizeValidationTest(AsyncHTTPTestCase):
+    """POST /optimize rejects batches the optimizer cannot rank with a 400, not a 500"""
+
+    def get_app(self):
+        self.app = make_app(backend=SimulationBackend(), stream=DeltaStream(), batcher=OptimizeBatcher())
+        return self.app
+
+    def tearDown(self):
+        self.app.settings["pool"].shutdown()
+        super().tearDown()
+
+    def optimize(self, batch):
+        return self.fetch("/optimize", method="POST", body=json.dumps({"batch": batch}))
+
+    def batch_with(self, **fields):
+        batch = make_batch(3, random.Random(0))
+        batch[0] = dict(batch[0], **fields)
+        return batch
+
+    def test_valid_batch_is_planned(self):
+        response = self.optimize(make_batch(3, random.Random(0)))
+        self.assertEqual(response.code, 200)
+        self.assertEqual(len(json.loads(response.body)["plan"]), 3)
+
+    def test_integer_ids_are_accepted(self):
+        batch = [dict(event, id=i) for i, event in enumerate(make_batch(3, random.Random(0)))]
+        self.assertEqual(self.optimize(batch).code, 200)
+
+    def test_non_numeric_delay(self):
+        self.assertEqual(self.optimize(self.batch_with(delay="soon")).code, 400)
+
+    def test_list_id(self):
+        self.assertEqual(self.optimize(self.batch_with(id=["T0"])).code, 400)
+
+    def test_dict_id(self):
+        self.assertEqual(self.optimize(self.batch_with(id={"id": "T0"})).code, 400)
+
+    def test_boolean_id(self):
+        self.assertEqual(self.optimize(self.batch_with(id=True)).code, 400)
+
+    def test_non_string_route(self):
+        self.assertEqual(self.optimize(self.batch_with(route=["North"])).code, 400)
+
+    def test_non_string_type(self):
+        self.assertEqual(self.optimize(self.batch_with(type=1)).code, 400)
+
+    def test_mixed_id_types(self):
+        self.assertEqual(self.optimize(self.batch_with(id=7)).code, 400)
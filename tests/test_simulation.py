@@ -0,0 +1,40 @@
+import random
+
+from simulation import Region, draw_tick, make_fleet
+from utils.precedence import PrecedenceOptimizer
+
+
+class TestRegionPrecedence:
+    def make_region(self):
+        return Region("test", fleet=make_fleet(20), seed=0)
+
+    def arrivals(self, region):
+        # Every train arriving, so all of them are planned
+        return [dict(event, type="Arrival") for event in draw_tick(random.Random(1), region.fleet)]
+
+    def test_restamped_events_are_synced_incrementally(self):
+        region = self.make_region()
+        events = self.arrivals(region)
+        region.apply_tick(events)
+        solves = region.precedence.solves
+
+        # The next tick stamps a new time on every event and changes one train's delay
+        events[0] = dict(events[0], delay=events[0]["delay"] + 30)
+        state = region.apply_tick(events)
+
+        assert region.precedence.solves == solves
+        expected = PrecedenceOptimizer().solve([dict(event, time=None) for event in events])
+        planned = {event["id"]: event["release"] for event in region.precedence.decisions()}
+        assert planned == {event["id"]: event["release"] for event in expected}
+        assert all(decision["time"] == state["active_trains"][0]["time"]
+                   for decision in region.precedence.decisions())
+
+    def test_many_changes_fall_back_to_a_full_solve(self):
+        region = self.make_region()
+        events = self.arrivals(region)
+        region.apply_tick(events)
+        solves = region.precedence.solves
+
+        region.apply_tick([dict(event, delay=event["delay"] + 30) for event in events])
+
+        assert region.precedence.solves == solves + 1
@@ -0,0 +1,29 @@
+import random
+
+from simulation import Region, draw_tick, make_fleet, with_stations
+from utils.network_map import NetworkMap
+from utils.train_controller import TrainController, reroute_via
+
+
+class TestRecommendationReroutes:
+    def make_controller(self):
+        return TrainController(route_graph=NetworkMap().graph)
+
+    def recommendations(self):
+        region = Region("test", fleet=make_fleet(10), seed=0)
+        events = [dict(event, type="Arrival") for event in draw_tick(random.Random(0), region.fleet)]
+        return region.apply_tick(events)["recommendations"]
+
+    def test_simulation_recommendation_names_a_via_station(self):
+        controller = self.make_controller()
+        rec = next(rec for rec in self.recommendations() if rec["name"] == "Mumbai Rajdhani Express")
+
+        via = reroute_via(controller.suggest_reroute(with_stations(rec)))
+
+        assert via == "via Mumbai Central → Chennai Central → New Delhi"
+
+    def test_train_off_the_network_has_no_reroute(self):
+        controller = self.make_controller()
+        rec = {"id": "12009-3", "name": "Mumbai Shatabdi Express", "route": "North"}
+
+        assert reroute_via(controller.suggest_reroute(with_stations(rec))) == ""
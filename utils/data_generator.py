@@ -1,21 +1,64 @@
+import numpy as np
 import pandas as pd
-import random
+import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+from utils.delay_propagation import DelayPropagator
+from utils.fleet_store import FleetStore, CODED_FIELDS, OBJECT_FIELDS
+from utils.route_graph import RouteGraph
+from utils.stations import STATION_COORDS, STATION_TABLE
+from utils.timetable import CHUNK_ROWS, read_timetable
+
+# DataFrame column -> fleet field, in display order
+TRAINS_DATAFRAME_COLUMNS = {
+    'Train ID': 'train_id',
+    'Train Name': 'train_name',
+    'Type': 'type',
+    'Priority': 'priority',
+    'Status': 'status',
+    'Route': 'route',
+    'Current Station': 'current_station',
+    'Destination': 'destination',
+    'Platform': 'platform',
+    'Coach Types': 'coach_types',
+    'Delay (min)': 'delay_minutes',
+    'Speed (km/h)': 'speed',
+    'Last Updated': 'last_updated',
+}
+
+# Display formatting, applied when the frame is rendered rather than when it is built
+TRAINS_DATAFRAME_FORMAT = {
+    'Speed (km/h)': '{:.1f}',
+    'Last Updated': lambda ts: ts.strftime('%H:%M:%S'),
+}
+
+# Offset that turns the fleet's epoch timestamps into naive local times
+LOCAL_UTC_OFFSET = datetime.now().astimezone().utcoffset()
+
+# A patch touching more than this share of rows replaces the whole column instead
+FULL_COLUMN_PATCH_RATIO = 0.25
+
+def style_trains_dataframe(df: pd.DataFrame):
+    """Format a trains DataFrame for display"""
+    return df.style.format(TRAINS_DATAFRAME_FORMAT)
 
 class TrainDataGenerator:
     """Generates and manages simulated train data"""
     
-    def __init__(self):
-        self.stations = [
-            'New Delhi', 'Mumbai Central', 'Chennai Central', 'Kolkata', 'Bangalore City', 'Hyderabad',
-            'Vijayawada', 'Visakhapatnam', 'Tirupati', 'Guntur', 'Rajahmundry', 'Kurnool', 
-            'Nellore', 'Kadapa', 'Anantapur'
-        ]
-        self.trains = self._generate_initial_trains()
+    def __init__(self, num_trains: int | None = None, seed: int | None = None,
+                 route_graph: RouteGraph | None = None):
+        self.rng = np.random.default_rng(seed)
+        # Without a route graph, disruptions only delay the train they hit
+        self.propagator = DelayPropagator(route_graph) if route_graph is not None else None
+        self.stations = list(STATION_COORDS)
+        self.trains = FleetStore.from_records(self._generate_initial_trains(num_trains))
+        self._trains_df = None
+        self._trains_df_version = 0
+        self._trains_df_vocab_sizes = {}
         
-    def _generate_initial_trains(self) -> List[Dict[str, Any]]:
-        """Generate initial set of trains"""
+    def _generate_initial_trains(self, num_trains: int | None = None) -> List[Dict[str, Any]]:
+        """Generate initial set of trains (one per route unless `num_trains` is given)"""
         train_types = [
             'Rajdhani Express', 'Shatabdi Express', 'Mail Express', 'Passenger', 'Freight', 'Suburban',
             'Local Passenger', 'MEMU', 'DEMU', 'Intercity Express', 'Superfast Express', 'Garib Rath',
@@ -53,36 +96,21 @@ class TrainDataGenerator:
             {'name': 'Special Train Festival', 'from': 'Tirupati', 'to': 'Chennai Central', 'type': 'Special Train'}
         ]
         
+        if num_trains is None:
+            num_trains = len(train_routes)
+        
         trains = []
-        for i, route in enumerate(train_routes):
+        for i in range(num_trains):
+            route = train_routes[i % len(train_routes)]
             # Generate realistic positions based on route
             from_station = route['from']
             to_station = route['to']
             
-            # Get station coordinates (simplified)
-            station_coords = {
-                'New Delhi': {'lat': 28.6139, 'lon': 77.2090},
-                'Mumbai Central': {'lat': 19.0176, 'lon': 72.8562},
-                'Chennai Central': {'lat': 13.0827, 'lon': 80.2707},
-                'Kolkata': {'lat': 22.5726, 'lon': 88.3639},
-                'Bangalore City': {'lat': 12.9716, 'lon': 77.5946},
-                'Hyderabad': {'lat': 17.3850, 'lon': 78.4867},
-                'Vijayawada': {'lat': 16.5062, 'lon': 80.6480},
-                'Visakhapatnam': {'lat': 17.6868, 'lon': 83.2185},
-                'Tirupati': {'lat': 13.6288, 'lon': 79.4192},
-                'Guntur': {'lat': 16.3067, 'lon': 80.4365},
-                'Rajahmundry': {'lat': 17.0005, 'lon': 81.8044},
-                'Kurnool': {'lat': 15.8309, 'lon': 78.0422},
-                'Nellore': {'lat': 14.4426, 'lon': 79.9864},
-                'Kadapa': {'lat': 14.4753, 'lon': 78.8252},
-                'Anantapur': {'lat': 14.6819, 'lon': 77.6006}
-            }
-            
-            from_coords = station_coords.get(from_station, {'lat': 16.0, 'lon': 80.0})
-            to_coords = station_coords.get(to_station, {'lat': 16.0, 'lon': 80.0})
+            from_coords = STATION_TABLE.coords(from_station)
+            to_coords = STATION_TABLE.coords(to_station)
             
             # Position train somewhere between stations
-            progress = random.uniform(0.1, 0.9)
+            progress = float(self.rng.uniform(0.1, 0.9))
             current_lat = from_coords['lat'] + (to_coords['lat'] - from_coords['lat']) * progress
             current_lon = from_coords['lon'] + (to_coords['lon'] - from_coords['lon']) * progress
             
@@ -95,28 +123,21 @@ class TrainDataGenerator:
                 priority = 'Low'
             
             # Determine speed based on train type
-            if route['type'] in ['Rajdhani Express', 'Shatabdi Express', 'Vande Bharat']:
-                speed = random.uniform(100, 130)
-            elif route['type'] in ['Mail Express', 'Superfast Express']:
-                speed = random.uniform(80, 110)
-            elif route['type'] in ['Local Passenger', 'MEMU', 'DEMU', 'Suburban']:
-                speed = random.uniform(30, 60)
-            else:
-                speed = random.uniform(50, 90)
+            speed = float(self.rng.uniform(*self._get_speed_range(route['type'])))
             
             train = {
                 'train_id': f'T{1000 + i}',
                 'train_name': route['name'],
                 'type': route['type'],
                 'priority': priority,
-                'status': random.choice(statuses),
+                'status': statuses[self.rng.integers(len(statuses))],
                 'current_station': from_station,
                 'destination': to_station,
                 'route': f"{from_station} → {to_station}",
-                'delay_minutes': random.randint(0, 45) if random.random() > 0.7 else 0,
+                'delay_minutes': int(self.rng.integers(0, 46)) if self.rng.random() > 0.7 else 0,
                 'speed': speed,
                 'coach_types': self._get_coach_types(route['type']),
-                'platform': random.randint(1, 8),
+                'platform': int(self.rng.integers(1, 9)),
                 'position': {
                     'lat': current_lat,
                     'lon': current_lon
@@ -127,6 +148,65 @@ class TrainDataGenerator:
         
         return trains
     
+    def _get_speed_range(self, train_type: str) -> Tuple[float, float]:
+        """Typical speed range (km/h) of a train type"""
+        if train_type in ['Rajdhani Express', 'Shatabdi Express', 'Vande Bharat']:
+            return 100, 130
+        if train_type in ['Mail Express', 'Superfast Express']:
+            return 80, 110
+        if train_type in ['Local Passenger', 'MEMU', 'DEMU', 'Suburban']:
+            return 30, 60
+        return 50, 90
+    
+    def load_timetable(self, path: str, chunksize: int = CHUNK_ROWS, service_date: datetime | None = None) -> int:
+        """Replace the fleet with the trains of a timetable CSV; returns the CSV rows read
+
+        The file is streamed in chunks (see `read_timetable`) and each chunk's
+        new trains are appended to the fleet column-wise. A train whose rows
+        continue into a later chunk keeps its origin and takes the later
+        destination. Speed and coach types follow the train type.
+        """
+        fleet = FleetStore()
+        rows = 0
+        for runs in read_timetable(path, chunksize, service_date):
+            rows += runs['rows']
+            ids = runs['train_id']
+            seen = np.fromiter((train_id in fleet.id_index for train_id in ids), dtype=bool, count=len(ids))
+            seen |= pd.Series(ids).duplicated().to_numpy()
+            new = ~seen
+            
+            types = runs['type'][new]
+            lo, hi = np.array([self._get_speed_range(t) for t in types.categories] + [(50, 90)]).T
+            codes = types.codes
+            coach_types = np.array([self._get_coach_types(t) for t in types.categories] + ['General'], dtype=object)
+            origins, destinations = runs['current_station'][new], runs['destination'][new]
+            fleet.extend_columns({
+                'train_id': ids[new].tolist(),
+                'train_name': [f'{train_type} {train_id}' for train_type, train_id in zip(types, ids[new])],
+                'type': types,
+                'priority': runs['priority'][new],
+                'status': ['On Time'] * int(new.sum()),
+                'current_station': origins,
+                'destination': destinations,
+                'route': [f'{a} → {b}' for a, b in zip(origins, destinations)],
+                'speed': self.rng.uniform(lo[codes], hi[codes]),
+                'coach_types': coach_types[codes].tolist(),
+                'platform': self.rng.integers(1, 9, size=int(new.sum())),
+                'lat': runs['lat'][new],
+                'lon': runs['lon'][new],
+                'last_updated': runs['last_updated'][new],
+            })
+            
+            # Trains continuing from an earlier chunk (or an earlier run) end further on
+            for train_id, destination in zip(ids[seen], runs['destination'][seen]):
+                train = fleet.get_by_id(train_id)
+                train['destination'] = destination
+                train['route'] = f"{train['current_station']} → {destination}"
+        
+        self.trains = fleet
+        self._trains_df = None
+        return rows
+    
     def _get_coach_types(self, train_type: str) -> str:
         """Get coach types based on train type"""
         coach_mapping = {
@@ -151,64 +231,96 @@ class TrainDataGenerator:
     
     def update_trains(self):
         """Update train positions and statuses"""
-        for train in self.trains:
-            # Randomly update some train properties
-            if random.random() < 0.3:  # 30% chance to update status
-                if train['status'] == 'Delayed' and random.random() < 0.4:
-                    train['status'] = 'On Time'
-                elif train['status'] == 'On Time' and random.random() < 0.1:
-                    train['status'] = 'Delayed'
-                    train['delay_minutes'] = random.randint(5, 20)
-            
-            # Update position slightly (simulate movement)
-            train['position']['lat'] += random.uniform(-0.001, 0.001)
-            train['position']['lon'] += random.uniform(-0.001, 0.001)
-            
-            # Update speed
-            train['speed'] = max(20, min(120, train['speed'] + random.uniform(-5, 5)))
-            
-            train['last_updated'] = datetime.now()
+        fleet = self.trains
+        n = len(fleet)
+        if n == 0:
+            return
+        rng = self.rng
+        
+        # 30% chance to update status: Delayed recovers with 0.4, On Time slips with 0.1
+        status = fleet.column('status')
+        roll = rng.random(n) < 0.3
+        flip = rng.random(n)
+        recovered = np.flatnonzero(roll & (status == fleet.code('status', 'Delayed')) & (flip < 0.4))
+        slipped = np.flatnonzero(roll & (status == fleet.code('status', 'On Time')) & (flip < 0.1))
+        fleet.update_column('status', fleet.code('status', 'On Time'), recovered)
+        fleet.update_column('status', fleet.code('status', 'Delayed'), slipped)
+        fleet.update_column('delay_minutes', rng.integers(5, 21, size=len(slipped)), slipped)
+        
+        # Update position slightly (simulate movement)
+        fleet.update_column('lat', fleet.column('lat') + rng.uniform(-0.001, 0.001, n))
+        fleet.update_column('lon', fleet.column('lon') + rng.uniform(-0.001, 0.001, n))
+        
+        # Update speed
+        fleet.update_column('speed', np.clip(fleet.column('speed') + rng.uniform(-5, 5, n), 20, 120))
+        
+        fleet.update_column('last_updated', time.time())
     
     def get_trains_dataframe(self) -> pd.DataFrame:
-        """Convert trains data to pandas DataFrame"""
-        df_data = []
-        for train in self.trains:
-            df_data.append({
-                'Train ID': train['train_id'],
-                'Train Name': train.get('train_name', 'N/A'),
-                'Type': train['type'],
-                'Priority': train['priority'],
-                'Status': train['status'],
-                'Route': train.get('route', f"{train['current_station']} → {train['destination']}"),
-                'Current Station': train['current_station'],
-                'Destination': train['destination'],
-                'Platform': train.get('platform', 'N/A'),
-                'Coach Types': train.get('coach_types', 'General'),
-                'Delay (min)': train['delay_minutes'],
-                'Speed (km/h)': f"{train['speed']:.1f}",
-                'Last Updated': train['last_updated'].strftime('%H:%M:%S')
+        """Trains as a typed DataFrame, patching only what changed since the last call
+
+        The frame is cached and shared between calls, so treat it as read-only.
+        Use `style_trains_dataframe` to format it for display.
+        """
+        fleet = self.trains
+        vocab_sizes = {field: len(fleet.vocab[field]) for field in CODED_FIELDS}
+        if (self._trains_df is None or len(self._trains_df) != len(fleet)
+                or vocab_sizes != self._trains_df_vocab_sizes):
+            self._trains_df = pd.DataFrame({
+                column: self._trains_df_values(field) for column, field in TRAINS_DATAFRAME_COLUMNS.items()
             })
-        
-        return pd.DataFrame(df_data)
+        else:
+            changed_fields = set(fleet.columns_changed_since(self._trains_df_version))
+            rows = fleet.changed_since(self._trains_df_version)
+            for j, (column, field) in enumerate(TRAINS_DATAFRAME_COLUMNS.items()):
+                if field not in changed_fields:
+                    continue
+                if len(rows) > FULL_COLUMN_PATCH_RATIO * len(fleet):
+                    self._trains_df[column] = self._trains_df_values(field)
+                else:
+                    self._trains_df.iloc[rows, j] = self._trains_df_values(field, rows)
+        self._trains_df_version = fleet.version
+        self._trains_df_vocab_sizes = vocab_sizes
+        return self._trains_df
+    
+    def _trains_df_values(self, field: str, rows: np.ndarray | None = None):
+        """Typed values of a fleet field for the trains DataFrame"""
+        fleet = self.trains
+        if field in OBJECT_FIELDS:
+            return pd.array(fleet.objects(field, rows), dtype=object)
+        values = fleet.column(field)
+        if rows is not None:
+            values = values[rows]
+        if field in CODED_FIELDS:
+            return pd.Categorical.from_codes(values, categories=fleet.vocab[field].values)
+        if field == 'last_updated':
+            return pd.to_datetime(values, unit='s') + LOCAL_UTC_OFFSET
+        return values.copy()
     
     def get_train_by_id(self, train_id: str) -> Dict[str, Any] | None:
         """Get specific train by ID"""
-        for train in self.trains:
-            if train['train_id'] == train_id:
-                return train
-        return None
+        return self.trains.get_by_id(train_id)
     
-    def inject_delay(self, train_id: str, delay_minutes: int):
-        """Inject delay to a specific train"""
+    def inject_delay(self, train_id: str, delay_minutes: int) -> np.ndarray | None:
+        """Inject delay to a specific train; returns the knock-on delays per fleet row"""
         train = self.get_train_by_id(train_id)
         if train:
             train['delay_minutes'] += delay_minutes
             train['status'] = 'Delayed'
+            return self._propagate(train, delay_minutes)
     
-    def simulate_breakdown(self, train_id: str):
-        """Simulate breakdown for a specific train"""
+    def simulate_breakdown(self, train_id: str) -> np.ndarray | None:
+        """Simulate breakdown for a specific train; returns the knock-on delays per fleet row"""
         train = self.get_train_by_id(train_id)
         if train:
+            breakdown_delay = int(self.rng.integers(15, 46))
             train['status'] = 'Waiting'
             train['speed'] = 0
-            train['delay_minutes'] += random.randint(15, 45)
+            train['delay_minutes'] += breakdown_delay
+            return self._propagate(train, breakdown_delay)
+    
+    def _propagate(self, train, minutes: int) -> np.ndarray | None:
+        """Push a disruption of `train` on to the trains queued behind it"""
+        if self.propagator is None:
+            return None
+        return self.propagator.apply(self.trains, train.row, minutes)
@@ -0,0 +1,197 @@
+import bisect
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+from zoneinfo import ZoneInfo
+
+from utils.state_publisher import atomic_write
+
+RECENT_ENTRIES = 200        # entries kept in memory for the dashboard
+SEGMENT_ENTRIES = 5000      # entries per on-disk segment before rotating
+INDEX_FILE = "index.json"
+TIMEZONE = ZoneInfo("Asia/Kolkata")  # decisions are stamped in the control room's time zone
+
+
+def journal_now() -> datetime:
+    """The current time as decisions are stamped: aware, in TIMEZONE"""
+    return datetime.now(TIMEZONE)
+
+
+def _aware(value: Any) -> Any:
+    """A datetime in TIMEZONE (naive ones are local time); other values unchanged"""
+    return value.astimezone(TIMEZONE) if isinstance(value, datetime) else value
+
+
+def _timestamp(value: Any) -> float:
+    """Epoch seconds of a datetime (naive ones are local time) or a number"""
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+def _encode(entry: Dict[str, Any]) -> str:
+    record = dict(entry)
+    if isinstance(record.get('timestamp'), datetime):
+        record['timestamp'] = record['timestamp'].isoformat()
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _decode(line: str) -> Dict[str, Any]:
+    entry = json.loads(line)
+    if isinstance(entry.get('timestamp'), str):
+        entry['timestamp'] = _aware(datetime.fromisoformat(entry['timestamp']))
+    return entry
+
+
+class DecisionJournal:
+    """Append-only log of control decisions: a recent ring plus rotated JSONL segments
+
+    The newest `recent_entries` decisions stay in memory for the dashboard.
+    With a `directory`, every decision is also appended to a JSONL segment
+    that rotates after `segment_entries` lines, and a small index of each
+    segment's time span is rewritten on rotation. A range query therefore
+    opens only the segments overlapping the range. Without a directory the
+    journal is memory-only and keeps just the ring.
+    """
+
+    def __init__(self, directory: str | None = None, recent_entries: int = RECENT_ENTRIES,
+                 segment_entries: int = SEGMENT_ENTRIES):
+        self.directory = directory
+        self.segment_entries = segment_entries
+        self._recent: deque = deque(maxlen=recent_entries)
+        self._lock = threading.Lock()
+        self.total = 0
+        # Closed segments as parallel lists, in append order
+        self._segment_names: List[str] = []
+        self._segment_starts: List[float] = []
+        self._segment_ends: List[float] = []
+        self._segment_counts: List[int] = []
+        # The segment being appended to
+        self._active: str | None = None
+        self._active_start: float | None = None
+        self._active_end: float | None = None
+        self._active_count = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        """Pick up the index and the active segment left by an earlier run"""
+        index_path = self._path(INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            for segment in index["segments"]:
+                self._segment_names.append(segment["name"])
+                self._segment_starts.append(segment["start"])
+                self._segment_ends.append(segment["end"])
+                self._segment_counts.append(segment["count"])
+            self._active = index.get("active")
+        self.total = sum(self._segment_counts)
+        if self._active is None:
+            self._active = self._segment_name(len(self._segment_names))
+        elif os.path.exists(self._path(self._active)):
+            for entry in self._read(self._active):
+                self._track_active(_timestamp(entry['timestamp']))
+                self._recent.append(entry)
+                self.total += 1
+        # Top the ring up from the closed segments, newest first, until it is full
+        for name in reversed(self._segment_names):
+            missing = self._recent.maxlen - len(self._recent)
+            if missing <= 0:
+                break
+            older = list(self._read(name))
+            self._recent.extendleft(reversed(older[-missing:]))
+
+    @staticmethod
+    def _segment_name(number: int) -> str:
+        return f"segment-{number:06d}.jsonl"
+
+    def _read(self, name: str) -> Iterator[Dict[str, Any]]:
+        with open(self._path(name), encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n") and line.strip():  # skip a line still being written
+                    yield _decode(line)
+
+    def _track_active(self, ts: float):
+        self._active_start = ts if self._active_start is None else min(self._active_start, ts)
+        self._active_end = ts if self._active_end is None else max(self._active_end, ts)
+        self._active_count += 1
+
+    def _write_index(self):
+        atomic_write(self._path(INDEX_FILE), json.dumps({
+            "segments": [
+                {"name": name, "start": start, "end": end, "count": count}
+                for name, start, end, count in zip(self._segment_names, self._segment_starts,
+                                                   self._segment_ends, self._segment_counts)
+            ],
+            "active": self._active
+        }))
+
+    def _rotate(self):
+        """Close the active segment and start a new one"""
+        self._segment_names.append(self._active)
+        self._segment_starts.append(self._active_start)
+        self._segment_ends.append(self._active_end)
+        self._segment_counts.append(self._active_count)
+        self._active = self._segment_name(len(self._segment_names))
+        self._active_start = self._active_end = None
+        self._active_count = 0
+        self._write_index()
+
+    def append(self, entry: Dict[str, Any]):
+        """Record one decision; it needs a 'timestamp' (datetime or epoch seconds)
+
+        Datetimes are kept aware in TIMEZONE, so entries from every writer,
+        and those read back after a restart, compare and sort together.
+        """
+        entry = dict(entry, timestamp=_aware(entry['timestamp']))
+        with self._lock:
+            self._recent.append(entry)
+            self.total += 1
+            if self.directory is None:
+                return
+            if self._active_count == 0 and not self._segment_names:
+                self._write_index()
+            with open(self._path(self._active), "a", encoding="utf-8") as f:
+                f.write(_encode(entry) + "\n")
+            self._track_active(_timestamp(entry['timestamp']))
+            if self._active_count >= self.segment_entries:
+                self._rotate()
+
+    def __len__(self) -> int:
+        return self.total
+
+    def recent(self, limit: int | None = None) -> List[Dict[str, Any]]:
+        """The newest decisions, oldest first"""
+        with self._lock:
+            entries = list(self._recent)
+        return entries[-limit:] if limit else entries
+
+    def query(self, start: datetime | float | None = None, end: datetime | float | None = None,
+              limit: int | None = None) -> List[Dict[str, Any]]:
+        """Decisions with start <= timestamp <= end, oldest first (the newest `limit` if given)"""
+        lo = float('-inf') if start is None else _timestamp(start)
+        hi = float('inf') if end is None else _timestamp(end)
+        with self._lock:
+            if self.directory is None:
+                names = []
+                candidates = list(self._recent)
+            else:
+                # Segments are in time order, so only a run of them can overlap
+                first = bisect.bisect_left(self._segment_ends, lo)
+                names = [
+                    name for name, seg_start in zip(self._segment_names[first:], self._segment_starts[first:])
+                    if seg_start <= hi
+                ]
+                if self._active_count and self._active_start <= hi and self._active_end >= lo:
+                    names.append(self._active)
+                candidates = []
+        for name in names:
+            candidates.extend(self._read(name))
+        entries = [entry for entry in candidates if lo <= _timestamp(entry['timestamp']) <= hi]
+        return entries[-limit:] if limit else entries
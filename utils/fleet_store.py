@@ -0,0 +1,486 @@
+import numpy as np
+import pandas as pd
+from collections.abc import MutableMapping, Sequence
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Iterator
+
+from utils.train_index import TrainIndex
+
+STATUSES = ['On Time', 'Delayed', 'Waiting', 'Rerouted']
+PRIORITIES = ['High', 'Medium', 'Low']
+
+# What a train without a type or priority is taken to be; never premium
+DEFAULT_TYPE = 'Special Train'
+DEFAULT_PRIORITY = 'Low'
+
+# Field order of the dict view, matching the original train records
+FIELDS = (
+    'train_id', 'train_name', 'type', 'priority', 'status', 'current_station', 'destination',
+    'route', 'delay_minutes', 'speed', 'coach_types', 'platform', 'position', 'last_updated'
+)
+
+NUMERIC_FIELDS = {
+    'delay_minutes': np.int64,
+    'speed': np.float64,
+    'platform': np.int16,
+    'lat': np.float64,
+    'lon': np.float64,
+    'last_updated': np.float64,  # epoch seconds
+}
+
+CODED_FIELDS = {
+    'type': np.int16,
+    'priority': np.int8,
+    'status': np.int8,
+    'current_station': np.int32,
+    'destination': np.int32,
+}
+
+OBJECT_FIELDS = ('train_id', 'train_name', 'route', 'coach_types')
+
+# Coded fields with a secondary index, kept current on every write
+INDEXED_FIELDS = ('status', 'type', 'priority', 'current_station')
+
+
+class Vocabulary:
+    """Maps categorical values to small integer codes"""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        """Get the code for a value, adding it if unseen"""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+    def decode(self, code: int) -> str:
+        """Get the value for a code"""
+        return self.values[code]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class FleetStore:
+    """Columnar (struct-of-arrays) store for the train fleet
+
+    Numeric fields live in NumPy arrays and categorical fields are stored as
+    integer codes, so whole-fleet updates are a few vectorized operations.
+    Indexing or iterating the store yields dict-style ``TrainView`` rows, which
+    keeps code written against the old list of dicts working.
+
+    Trains can be looked up by id in O(1), and ``select`` filters through
+    secondary indexes on status, type, priority and current station.
+
+    Every write bumps ``version`` and stamps the touched rows and field, so
+    consumers can ask what changed since the version they last saw. Listeners
+    added with `add_listener` are instead pushed each change as it happens:
+    ``on_append(store, row)`` for new trains and ``on_change(store, field,
+    rows, old, new)`` for writes to the numeric or coded columns they watch.
+    Writes to columns no listener watches stay on the plain vectorized path.
+    """
+
+    def __init__(self, capacity: int = 0):
+        self.size = 0
+        self.capacity = max(capacity, 16)
+        self.vocab = {field: Vocabulary() for field in CODED_FIELDS}
+        self.vocab['status'] = Vocabulary(STATUSES)
+        self.vocab['priority'] = Vocabulary(PRIORITIES)
+        self._arrays = {
+            field: np.zeros(self.capacity, dtype=dtype)
+            for field, dtype in {**NUMERIC_FIELDS, **CODED_FIELDS}.items()
+        }
+        self._objects: Dict[str, List[Any]] = {field: [] for field in OBJECT_FIELDS}
+        self.id_index: Dict[str, int] = {}
+        self.indexes = {field: TrainIndex() for field in INDEXED_FIELDS}
+        self.version = 0
+        self.column_version: Dict[str, int] = {}
+        self._row_version = np.zeros(self.capacity, dtype=np.int64)
+        self.listeners: List[Any] = []
+        self._listener_fields: Dict[int, frozenset | None] = {}
+        self._appending = False
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'FleetStore':
+        """Build a store from train dicts"""
+        records = list(records)
+        store = cls(capacity=len(records))
+        store.extend(records)
+        return store
+
+    def _reserve(self, needed: int):
+        """Grow the arrays so they can hold at least `needed` rows"""
+        if needed <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for field, array in self._arrays.items():
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self._arrays[field] = grown
+        row_version = np.zeros(capacity, dtype=np.int64)
+        row_version[:self.size] = self._row_version[:self.size]
+        self._row_version = row_version
+        self.capacity = capacity
+
+    def append(self, train: Dict[str, Any]) -> int:
+        """Add a train and return its row number"""
+        self._reserve(self.size + 1)
+        row = self.size
+        self.size += 1
+        for field in OBJECT_FIELDS:
+            self._objects[field].append(None)
+        for field in INDEXED_FIELDS:
+            self._arrays[field][row] = -1  # not indexed yet
+        self._appending = True
+        try:
+            for field in FIELDS:
+                self.set(row, field, train.get(field, self._default(field)))
+        finally:
+            self._appending = False
+        for listener in self.listeners:
+            listener.on_append(self, row)
+        return row
+
+    def extend(self, trains: Iterable[Dict[str, Any]]):
+        """Add several trains"""
+        for train in trains:
+            self.append(train)
+
+    def extend_columns(self, columns: Dict[str, Any]) -> np.ndarray:
+        """Add a batch of trains given column-wise and return their rows
+
+        `columns` maps fields to equal-length sequences, with 'lat'/'lon' for
+        positions and epoch seconds for 'last_updated'. Coded fields may be
+        pandas Categoricals, in which case only the categories are looked up
+        in the vocabulary. Missing fields get their defaults. This is the bulk
+        path for loading large fleets; it never builds per-train dicts.
+        """
+        count = len(columns['train_id'])
+        start = self.size
+        self._reserve(start + count)
+        rows = np.arange(start, start + count)
+        self.size += count
+        for field in OBJECT_FIELDS:
+            values = columns.get(field)
+            self._objects[field].extend(values if values is not None else [self._default(field)] * count)
+        self.id_index.update(zip(self._objects['train_id'][start:], rows.tolist()))
+        for field in NUMERIC_FIELDS:
+            default = datetime.now().timestamp() if field == 'last_updated' else 0
+            self._arrays[field][start:start + count] = columns.get(field, default)
+        for field in CODED_FIELDS:
+            codes = self._codes(field, columns.get(field, [''] * count))
+            self._arrays[field][start:start + count] = codes
+            if field in self.indexes:
+                self.indexes[field].move_many(rows, np.full(count, -1), codes)
+        for field in (*NUMERIC_FIELDS, *CODED_FIELDS, *OBJECT_FIELDS):
+            self._touch(field, rows)
+        for listener in self.listeners:
+            for row in rows.tolist():
+                listener.on_append(self, row)
+        return rows
+
+    def _codes(self, field: str, values: Any) -> np.ndarray:
+        """Vocabulary codes of many values, looking up each distinct value once"""
+        if not hasattr(values, 'categories'):
+            values = pd.Categorical(values)
+        vocab = self.vocab[field]
+        # Missing values (code -1) take the field's default rather than wrapping to the last category
+        mapping = np.array([vocab.code(value) for value in values.categories] + [vocab.code(self._default(field))],
+                           dtype=CODED_FIELDS[field])
+        return mapping[np.asarray(values.codes, dtype=np.intp)]
+
+    def _default(self, field: str) -> Any:
+        """Default value for a field missing from an appended record"""
+        if field == 'position':
+            return {'lat': 0.0, 'lon': 0.0}
+        if field == 'last_updated':
+            return datetime.now()
+        if field in NUMERIC_FIELDS:
+            return 0
+        if field == 'type':
+            return DEFAULT_TYPE
+        if field == 'priority':
+            return DEFAULT_PRIORITY
+        return 'N/A' if field in OBJECT_FIELDS else ''
+
+    def add_listener(self, listener: Any, fields: Iterable[str] | None = None):
+        """Push future appends, and changes to `fields` (every column by default), to `listener`"""
+        self.listeners.append(listener)
+        self._listener_fields[id(listener)] = None if fields is None else frozenset(fields)
+
+    def remove_listener(self, listener: Any):
+        """Stop pushing changes to `listener`"""
+        self.listeners.remove(listener)
+        del self._listener_fields[id(listener)]
+
+    def _watchers(self, field: str) -> List[Any]:
+        """Listeners watching `field`"""
+        return [listener for listener in self.listeners
+                if (fields := self._listener_fields[id(listener)]) is None or field in fields]
+
+    def _notify(self, listeners: List[Any], field: str, rows: np.ndarray, old: np.ndarray, new: np.ndarray):
+        for listener in listeners:
+            listener.on_change(self, field, rows, old, new)
+
+    def _touch(self, field: str, rows: Any):
+        """Record that `rows` (a slice, index or array) of `field` changed"""
+        self.version += 1
+        self._row_version[rows] = self.version
+        self.column_version[field] = self.version
+
+    def changed_since(self, version: int) -> np.ndarray:
+        """Rows written after `version`"""
+        return np.flatnonzero(self._row_version[:self.size] > version)
+
+    def columns_changed_since(self, version: int) -> List[str]:
+        """Fields written after `version` (lat/lon for positions)"""
+        return [field for field, seen in self.column_version.items() if seen > version]
+
+    def _check_row(self, row: int) -> int:
+        if not 0 <= row < self.size:
+            raise IndexError(f'fleet row {row} out of range')
+        return row
+
+    def get(self, row: int, field: str) -> Any:
+        """Read one field of one train"""
+        self._check_row(row)
+        if field == 'position':
+            return PositionView(self, row)
+        if field in CODED_FIELDS:
+            return self.vocab[field].values[self._arrays[field][row]]
+        if field == 'last_updated':
+            return datetime.fromtimestamp(self._arrays[field][row])
+        if field in NUMERIC_FIELDS:
+            return self._arrays[field][row].item()
+        if field in OBJECT_FIELDS:
+            return self._objects[field][row]
+        raise KeyError(field)
+
+    def set(self, row: int, field: str, value: Any):
+        """Write one field of one train"""
+        self._check_row(row)
+        if field == 'position':
+            self._write(row, 'lat', value['lat'])
+            self._write(row, 'lon', value['lon'])
+            return
+        if field in CODED_FIELDS:
+            code = self.vocab[field].code(value)
+            if field in self.indexes:
+                self.indexes[field].move(row, int(self._arrays[field][row]), code)
+            self._write(row, field, code)
+            return
+        if field == 'last_updated':
+            self._write(row, field, value.timestamp())
+            return
+        if field in NUMERIC_FIELDS:
+            self._write(row, field, value)
+            return
+        if field in OBJECT_FIELDS:
+            if field == 'train_id':
+                old_id = self._objects[field][row]
+                if self.id_index.get(old_id) == row:
+                    del self.id_index[old_id]
+                self.id_index[value] = row
+            self._objects[field][row] = value
+        else:
+            raise KeyError(field)
+        self._touch(field, row)
+
+    def _write(self, row: int, field: str, value: Any):
+        """Write one array cell, stamping and announcing the change"""
+        array = self._arrays[field]
+        old = array[row]
+        array[row] = value
+        self._touch(field, row)
+        if self.listeners and not self._appending:
+            watchers = self._watchers(field)
+            if watchers:
+                self._notify(watchers, field, np.array([row]), np.array([old]), array[row:row + 1].copy())
+
+    def column(self, field: str) -> np.ndarray:
+        """Read-only view of a numeric or coded column"""
+        view = self._arrays[field][:self.size]
+        view.flags.writeable = False
+        return view
+
+    def objects(self, field: str, rows: np.ndarray | None = None) -> List[Any]:
+        """Values of a string field, for all rows or the given ones"""
+        values = self._objects[field]
+        if rows is None:
+            return list(values)
+        return [values[row] for row in rows.tolist()]
+
+    def code(self, field: str, value: str) -> int:
+        """Code of a categorical value"""
+        return self.vocab[field].code(value)
+
+    def update_column(self, field: str, values: Any, rows: np.ndarray | None = None):
+        """Vectorized write of a numeric or coded column (codes for coded fields)"""
+        if isinstance(rows, np.ndarray) and rows.size == 0:
+            return
+        array = self._arrays[field]
+        watchers = self._watchers(field) if self.listeners else []
+        if field in self.indexes or watchers:
+            rows = np.arange(self.size) if rows is None else np.atleast_1d(rows)
+            old = array[rows]
+            new = np.broadcast_to(np.asarray(values, dtype=old.dtype), old.shape)
+            if field in self.indexes:
+                self.indexes[field].move_many(rows, old, new)
+            array[rows] = new
+            self._touch(field, rows)
+            if watchers:
+                self._notify(watchers, field, rows, old, array[rows])
+            return
+        if rows is None:
+            rows = slice(0, self.size)
+        array[rows] = values
+        self._touch(field, rows)
+
+    def row_of(self, train_id: str) -> int | None:
+        """Row number of a train id, or None"""
+        return self.id_index.get(train_id)
+
+    def get_by_id(self, train_id: str) -> 'TrainView | None':
+        """Dict-style view of a train by id, or None"""
+        row = self.id_index.get(train_id)
+        return None if row is None else TrainView(self, row)
+
+    def rows_where(self, **criteria: Any) -> np.ndarray:
+        """Sorted rows matching every criterion, e.g. ``status='Delayed'``
+
+        A criterion value may be a single value or a list of accepted values.
+        """
+        result = None
+        for field, values in criteria.items():
+            if isinstance(values, str):
+                values = [values]
+            codes = [self.vocab[field].codes[v] for v in values if v in self.vocab[field].codes]
+            rows = self.indexes[field].lookup(codes)
+            result = rows if result is None else result & rows
+            if not result:
+                break
+        if not result:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.fromiter(result, dtype=np.int64, count=len(result)))
+
+    def select(self, **criteria: Any) -> 'FleetSelection':
+        """Trains matching every criterion, as a lazy sequence of views"""
+        return FleetSelection(self, self.rows_where(**criteria))
+
+    def count(self, field: str, value: str) -> int:
+        """Number of trains with a given indexed field value"""
+        code = self.vocab[field].codes.get(value)
+        return 0 if code is None else self.indexes[field].count(code)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Plain dict copies of every train"""
+        return [view.to_dict() for view in self]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TrainView(self, row) for row in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        return TrainView(self, self._check_row(index))
+
+    def __iter__(self) -> Iterator['TrainView']:
+        for row in range(self.size):
+            yield TrainView(self, row)
+
+
+class FleetSelection(Sequence):
+    """Lazy sequence of TrainViews over a set of fleet rows"""
+
+    def __init__(self, store: FleetStore, rows: np.ndarray):
+        self._store = store
+        self.rows = rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TrainView(self._store, int(row)) for row in self.rows[index]]
+        return TrainView(self._store, int(self.rows[index]))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class TrainView(MutableMapping):
+    """Dict-style view of one train row; writes go straight to the store"""
+
+    __slots__ = ('_store', 'row')
+
+    def __init__(self, store: FleetStore, row: int):
+        self._store = store
+        self.row = row
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in FIELDS:
+            raise KeyError(key)
+        return self._store.get(self.row, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in FIELDS:
+            raise KeyError(key)
+        self._store.set(self.row, key, value)
+
+    def __delitem__(self, key: str):
+        raise TypeError('Fleet rows have a fixed set of fields')
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict copy of the row"""
+        train = {key: self[key] for key in FIELDS}
+        train['position'] = dict(train['position'])
+        return train
+
+    def __repr__(self) -> str:
+        return f'TrainView({self.to_dict()!r})'
+
+
+class PositionView(MutableMapping):
+    """Dict-style view of a train's lat/lon"""
+
+    __slots__ = ('_store', 'row')
+
+    def __init__(self, store: FleetStore, row: int):
+        self._store = store
+        self.row = row
+
+    def __getitem__(self, key: str) -> float:
+        if key not in ('lat', 'lon'):
+            raise KeyError(key)
+        return self._store._arrays[key][self.row].item()
+
+    def __setitem__(self, key: str, value: float):
+        if key not in ('lat', 'lon'):
+            raise KeyError(key)
+        self._store.update_column(key, value, self.row)
+
+    def __delitem__(self, key: str):
+        raise TypeError('Positions always have lat and lon')
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(('lat', 'lon'))
+
+    def __len__(self) -> int:
+        return 2
+
+    def __repr__(self) -> str:
+        return f'PositionView({dict(self)!r})'
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Iterable
+
+import numpy as np
+
+THROUGHPUT_WINDOW = 3600  # seconds of events behind the throughput rate
+MAX_DELAY_BIN = 720       # delays are binned per minute; longer ones share the last bin
+
+
+class EventWindow:
+    """Counts timestamped events over a sliding time window
+
+    Events are appended in time order and expired from the front as the
+    window moves, and a running count per kind is kept alongside, so reading
+    a count or rate is O(1) apart from the expiry. Safe to record from one
+    thread while others read.
+    """
+
+    def __init__(self, window_seconds: float = THROUGHPUT_WINDOW):
+        self.window_seconds = window_seconds
+        self.started_at: float | None = None
+        self._events: deque = deque()
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, at: float | None = None):
+        """Record one event of `kind` at epoch time `at` (now by default)"""
+        at = time.time() if at is None else at
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = at
+            self._events.append((at, kind))
+            self._counts[kind] += 1
+            self._expire(at)
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        events = self._events
+        while events and events[0][0] < cutoff:
+            _, kind = events.popleft()
+            self._counts[kind] -= 1
+
+    def count(self, kinds: Iterable[str] | None = None, now: float | None = None) -> int:
+        """Events in the window, optionally only of the given kinds"""
+        with self._lock:
+            self._expire(time.time() if now is None else now)
+            if kinds is None:
+                return len(self._events)
+            return sum(self._counts[kind] for kind in kinds)
+
+    def rate_per_hour(self, kinds: Iterable[str] | None = None, now: float | None = None) -> float:
+        """Events per hour over the window, or over the time since the first event if shorter"""
+        now = time.time() if now is None else now
+        count = self.count(kinds, now)
+        if self.started_at is None:
+            return 0.0
+        span = min(self.window_seconds, max(now - self.started_at, 60.0))
+        return count * 3600 / span
+
+
+class StreamingMetrics:
+    """System metrics of a fleet, maintained from its changes as they happen
+
+    Attached to a FleetStore, it keeps the delay total and a per-minute delay
+    histogram up to date from the store's change notifications, so reading the
+    average and percentiles never scans the trains. Throughput comes from the
+    arrival and departure events of an `EventWindow`: those recorded by the
+    simulation, plus a departure and an arrival whenever a followed train's
+    current station changes. Utilization is the number of trains over the
+    network's section capacity.
+    """
+
+    def __init__(self, capacity: int, events: EventWindow | None = None,
+                 throughput_kinds: Iterable[str] = ('Arrival', 'Departure')):
+        self.capacity = capacity
+        self.events = events if events is not None else EventWindow()
+        self.throughput_kinds = tuple(throughput_kinds)
+        self.fleet = None
+        self.trains = 0
+        self.delay_sum = 0
+        self.delay_histogram = np.zeros(MAX_DELAY_BIN + 1, dtype=np.int64)
+
+    @staticmethod
+    def _bins(delays: np.ndarray) -> np.ndarray:
+        return np.clip(delays, 0, MAX_DELAY_BIN).astype(np.intp)
+
+    def attach(self, fleet):
+        """Start following `fleet` (a FleetStore), replacing any fleet followed so far"""
+        if self.fleet is not None:
+            self.fleet.remove_listener(self)
+        delays = fleet.column('delay_minutes')
+        self.fleet = fleet
+        self.trains = len(fleet)
+        self.delay_sum = int(delays.sum())
+        self.delay_histogram = np.bincount(self._bins(delays), minlength=MAX_DELAY_BIN + 1).astype(np.int64)
+        fleet.add_listener(self, fields=('delay_minutes', 'current_station'))
+
+    def on_append(self, fleet, row: int):
+        delay = fleet.column('delay_minutes')[row]
+        self.trains += 1
+        self.delay_sum += int(delay)
+        self.delay_histogram[self._bins(np.array([delay]))] += 1
+
+    def on_change(self, fleet, field: str, rows: np.ndarray, old: np.ndarray, new: np.ndarray):
+        if field == 'current_station':
+            self._record_moves(np.count_nonzero(old != new))
+            return
+        if field != 'delay_minutes':
+            return
+        self.delay_sum += int(new.sum() - old.sum())
+        np.subtract.at(self.delay_histogram, self._bins(old), 1)
+        np.add.at(self.delay_histogram, self._bins(new), 1)
+
+    def _record_moves(self, trains: int):
+        """A departure and an arrival for each train that moved on to another station"""
+        now = time.time()
+        for _ in range(int(trains)):
+            self.events.record('Departure', now)
+            self.events.record('Arrival', now)
+
+    def record_event(self, kind: str, at: float | None = None):
+        """Record an arrival, departure or other movement event"""
+        self.events.record(kind, at)
+
+    def percentile(self, q: float) -> float:
+        """Delay (minutes) at percentile `q` of the followed trains"""
+        if not self.trains:
+            return 0.0
+        rank = np.ceil(q / 100 * self.trains)
+        return float(np.searchsorted(np.cumsum(self.delay_histogram), max(rank, 1)))
+
+    def throughput(self, now: float | None = None) -> float:
+        """Movements per hour over the sliding window"""
+        return self.events.rate_per_hour(self.throughput_kinds, now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current metrics of the followed fleet"""
+        if not self.trains:
+            return {'avg_delay': 0, 'p50_delay': 0, 'p95_delay': 0,
+                    'throughput': self.throughput(), 'utilization': 0}
+        return {
+            'avg_delay': self.delay_sum / self.trains,
+            'p50_delay': self.percentile(50),
+            'p95_delay': self.percentile(95),
+            'throughput': self.throughput(),
+            'utilization': min(100, self.trains / self.capacity * 100) if self.capacity else 0
+        }
@@ -1,7 +1,28 @@
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+from utils.fleet_store import FleetStore
+from utils.route_graph import RouteGraph
+from utils.spatial_index import spatial_index
+from utils.stations import STATION_COORDS
+
+# Color and line width by track status
+TRACK_STYLES = {
+    'normal': {'color': 'green', 'width': 2},
+    'congested': {'color': 'orange', 'width': 4},
+    'maintenance': {'color': 'red', 'width': 2},
+}
+
+# Color mapping for train status
+STATUS_COLORS = {
+    'On Time': 'green',
+    'Delayed': 'red',
+    'Waiting': 'orange',
+    'Rerouted': 'purple'
+}
 
 class NetworkMap:
     """Creates and manages the railway network visualization"""
@@ -9,26 +30,14 @@ class NetworkMap:
     def __init__(self):
         self.stations = self._define_stations()
         self.tracks = self._define_tracks()
+        self.graph = RouteGraph(self.stations, self.tracks)
+        self._figure = None  # cached figure holding the static station/track layer
+        self.version = 0  # bumped whenever the static layer changes
+        self._base_trace_count = 0
     
     def _define_stations(self) -> Dict[str, Dict[str, float]]:
         """Define Indian railway station positions with focus on South India"""
-        return {
-            'New Delhi': {'lat': 28.6139, 'lon': 77.2090},
-            'Mumbai Central': {'lat': 19.0176, 'lon': 72.8562},
-            'Chennai Central': {'lat': 13.0827, 'lon': 80.2707},
-            'Kolkata': {'lat': 22.5726, 'lon': 88.3639},
-            'Bangalore City': {'lat': 12.9716, 'lon': 77.5946},
-            'Hyderabad': {'lat': 17.3850, 'lon': 78.4867},
-            'Vijayawada': {'lat': 16.5062, 'lon': 80.6480},
-            'Visakhapatnam': {'lat': 17.6868, 'lon': 83.2185},
-            'Tirupati': {'lat': 13.6288, 'lon': 79.4192},
-            'Guntur': {'lat': 16.3067, 'lon': 80.4365},
-            'Rajahmundry': {'lat': 17.0005, 'lon': 81.8044},
-            'Kurnool': {'lat': 15.8309, 'lon': 78.0422},
-            'Nellore': {'lat': 14.4426, 'lon': 79.9864},
-            'Kadapa': {'lat': 14.4753, 'lon': 78.8252},
-            'Anantapur': {'lat': 14.6819, 'lon': 77.6006}
-        }
+        return {name: dict(coords) for name, coords in STATION_COORDS.items()}
     
     def _define_tracks(self) -> List[Dict[str, Any]]:
         """Define track segments between Indian railway stations"""
@@ -64,8 +73,30 @@ class NetworkMap:
             {'from': 'Hyderabad', 'to': 'Bangalore City', 'status': 'normal'},
         ]
     
-    def create_network_figure(self, trains: List[Dict[str, Any]]) -> go.Figure:
-        """Create the network visualization figure"""
+    def create_network_figure(self, trains: List[Dict[str, Any]],
+                              viewport: Tuple[float, float, float, float] | None = None) -> go.Figure:
+        """Create the network visualization figure
+
+        The station and track layer is built once and cached; each call only
+        replaces the train traces. The returned figure is reused by the next
+        call, so render it before asking for another one. With a `viewport`
+        (min_lat, min_lon, max_lat, max_lon) only the trains inside it are
+        drawn, found through the fleet's spatial index.
+        """
+        if self._figure is None:
+            self._figure = self._build_base_figure()
+            self._base_trace_count = len(self._figure.data)
+        
+        fig = self._figure
+        fig.data = fig.data[:self._base_trace_count]
+        
+        # Add trains
+        self._add_trains_to_figure(fig, trains, viewport)
+        
+        return fig
+    
+    def _build_base_figure(self) -> go.Figure:
+        """Build the static part of the figure: tracks, stations and layout"""
         fig = go.Figure()
         
         # Add track lines
@@ -74,9 +105,6 @@ class NetworkMap:
         # Add stations
         self._add_stations_to_figure(fig)
         
-        # Add trains
-        self._add_trains_to_figure(fig, trains)
-        
         # Configure layout for India
         fig.update_layout(
             title="Indian Railway Network Status",
@@ -92,28 +120,43 @@ class NetworkMap:
         
         return fig
     
+    def invalidate(self):
+        """Drop the cached station/track layer so the next figure rebuilds it"""
+        self._figure = None
+        self.version += 1
+    
+    def set_track_status(self, from_station: str, to_station: str, status: str):
+        """Change the status of the track between two stations"""
+        for track in self.tracks:
+            if {track['from'], track['to']} == {from_station, to_station}:
+                track['status'] = status
+        self.graph.set_track_status(from_station, to_station, status)
+        self.invalidate()
+    
     def _add_tracks_to_figure(self, fig: go.Figure):
-        """Add track segments to the figure"""
+        """Add track segments to the figure, one trace per track status"""
+        status_groups = {}
         for track in self.tracks:
             from_station = self.stations[track['from']]
             to_station = self.stations[track['to']]
+            hovertext = f"{track['from']}-{track['to']}: {track['status'].title()}"
             
-            # Color based on track status
-            color_map = {
-                'normal': 'green',
-                'congested': 'orange',
-                'maintenance': 'red'
-            }
-            color = color_map.get(track['status'], 'gray')
-            width = 4 if track['status'] == 'congested' else 2
-            
+            # None breaks the line between consecutive segments
+            group = status_groups.setdefault(track['status'], {'lats': [], 'lons': [], 'texts': []})
+            group['lats'].extend([from_station['lat'], to_station['lat'], None])
+            group['lons'].extend([from_station['lon'], to_station['lon'], None])
+            group['texts'].extend([hovertext, hovertext, None])
+        
+        for status, data in status_groups.items():
+            style = TRACK_STYLES.get(status, {'color': 'gray', 'width': 2})
             fig.add_trace(go.Scattermapbox(
-                lat=[from_station['lat'], to_station['lat']],
-                lon=[from_station['lon'], to_station['lon']],
+                lat=data['lats'],
+                lon=data['lons'],
                 mode='lines',
-                line=dict(color=color, width=width),
-                name=f"Track {track['from']}-{track['to']}",
-                hovertext=f"Status: {track['status'].title()}",
+                line=dict(color=style['color'], width=style['width']),
+                name=f"Tracks ({status.title()})",
+                hovertext=data['texts'],
+                hoverinfo='text',
                 showlegend=False
             ))
     
@@ -139,27 +182,28 @@ class NetworkMap:
             hovertext=[f"Station: {name}" for name in station_names]
         ))
     
-    def _add_trains_to_figure(self, fig: go.Figure, trains: List[Dict[str, Any]]):
+    def _add_trains_to_figure(self, fig: go.Figure, trains: List[Dict[str, Any]],
+                              viewport: Tuple[float, float, float, float] | None = None):
         """Add train markers to the figure"""
         # Group trains by status for better visualization
-        status_groups = {}
-        for train in trains:
-            status = train['status']
-            if status not in status_groups:
-                status_groups[status] = {'lats': [], 'lons': [], 'texts': [], 'ids': []}
-            
-            status_groups[status]['lats'].append(train['position']['lat'])
-            status_groups[status]['lons'].append(train['position']['lon'])
-            status_groups[status]['texts'].append(train['train_id'])
-            status_groups[status]['ids'].append(train['train_id'])
-        
-        # Color mapping for train status
-        status_colors = {
-            'On Time': 'green',
-            'Delayed': 'red',
-            'Waiting': 'orange',
-            'Rerouted': 'purple'
-        }
+        if isinstance(trains, FleetStore):
+            rows = spatial_index(trains).in_box(*viewport) if viewport is not None else None
+            status_groups = self._group_fleet_by_status(trains, rows)
+        else:
+            if viewport is not None:
+                min_lat, min_lon, max_lat, max_lon = viewport
+                trains = [train for train in trains
+                          if min_lat <= train['position']['lat'] <= max_lat
+                          and min_lon <= train['position']['lon'] <= max_lon]
+            status_groups = {}
+            for train in trains:
+                status = train['status']
+                if status not in status_groups:
+                    status_groups[status] = {'lats': [], 'lons': [], 'ids': []}
+                
+                status_groups[status]['lats'].append(train['position']['lat'])
+                status_groups[status]['lons'].append(train['position']['lon'])
+                status_groups[status]['ids'].append(train['train_id'])
         
         # Add train markers by status
         for status, data in status_groups.items():
@@ -169,12 +213,31 @@ class NetworkMap:
                 mode='markers+text',
                 marker=dict(
                     size=12,
-                    color=status_colors.get(status, 'gray'),
+                    color=STATUS_COLORS.get(status, 'gray'),
                     symbol='circle'
                 ),
-                text=data['texts'],
+                text=data['ids'],
                 textposition='top center',
                 textfont=dict(size=8, color='white'),
                 name=f'Trains ({status})',
                 hovertext=[f"Train {tid} - {status}" for tid in data['ids']]
             ))
+    
+    def _group_fleet_by_status(self, fleet: FleetStore, subset: np.ndarray | None = None) -> Dict[str, Dict[str, Any]]:
+        """Group fleet positions by status straight from its columns and indexes
+
+        With `subset`, only those rows (e.g. the trains in a viewport) are grouped.
+        """
+        lats = fleet.column('lat')
+        lons = fleet.column('lon')
+        codes = fleet.column('status')[subset] if subset is not None else None
+        status_groups = {}
+        for code, status in enumerate(fleet.vocab['status'].values):
+            rows = fleet.rows_where(status=status) if subset is None else subset[codes == code]
+            if len(rows):
+                status_groups[status] = {
+                    'lats': lats[rows],
+                    'lons': lons[rows],
+                    'ids': fleet.objects('train_id', rows)
+                }
+        return status_groups
@@ -0,0 +1,114 @@
+import heapq
+from typing import Any, Dict, Hashable, List, Tuple
+
+
+class IndexedHeap:
+    """Binary min-heap keyed by id, with O(log n) key changes
+
+    A position map from id to heap slot lets `push` change the key of an item
+    already in the heap, and `remove` drop any item, by sifting just that
+    entry. `top(k)` reads the k smallest in order in O(k log k) without
+    disturbing the heap, so the current top-k never needs a sort.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[Any, Hashable]] = []
+        self._position: Dict[Hashable, int] = {}
+        self._items: Dict[Hashable, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._position
+
+    def key(self, item_id: Hashable) -> Any:
+        """Current key of an item"""
+        return self._heap[self._position[item_id]][0]
+
+    def get(self, item_id: Hashable, default: Any = None) -> Any:
+        """Payload stored with an item"""
+        return self._items.get(item_id, default)
+
+    def push(self, item_id: Hashable, key: Any, item: Any = None):
+        """Insert an item, or change its key and payload if already present"""
+        self._items[item_id] = item
+        index = self._position.get(item_id)
+        if index is None:
+            self._heap.append((key, item_id))
+            self._position[item_id] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+            return
+        old_key = self._heap[index][0]
+        self._heap[index] = (key, item_id)
+        if key < old_key:
+            self._sift_up(index)
+        elif old_key < key:
+            self._sift_down(index)
+
+    def remove(self, item_id: Hashable) -> bool:
+        """Drop an item if present; True if it was there"""
+        index = self._position.pop(item_id, None)
+        if index is None:
+            return False
+        del self._items[item_id]
+        last = self._heap.pop()
+        if index < len(self._heap):
+            old_key = self._heap[index][0]
+            self._heap[index] = last
+            self._position[last[1]] = index
+            if last[0] < old_key:
+                self._sift_up(index)
+            else:
+                self._sift_down(index)
+        return True
+
+    def pop(self) -> Tuple[Hashable, Any]:
+        """Remove and return the (id, item) with the smallest key"""
+        if not self._heap:
+            raise IndexError('pop from an empty IndexedHeap')
+        item_id = self._heap[0][1]
+        item = self._items[item_id]
+        self.remove(item_id)
+        return item_id, item
+
+    def top(self, k: int) -> List[Any]:
+        """Payloads of the k smallest keys, smallest first, leaving the heap untouched"""
+        result = []
+        frontier = [(self._heap[0], 0)] if self._heap and k > 0 else []
+        while frontier and len(result) < k:
+            (_, item_id), index = heapq.heappop(frontier)
+            result.append(self._items[item_id])
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self._heap):
+                    heapq.heappush(frontier, (self._heap[child], child))
+        return result
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._position[heap[i][1]] = i
+        self._position[heap[j][1]] = j
+
+    def _sift_up(self, index: int):
+        heap = self._heap
+        while index > 0:
+            parent = (index - 1) // 2
+            if heap[index] < heap[parent]:
+                self._swap(index, parent)
+                index = parent
+            else:
+                break
+
+    def _sift_down(self, index: int):
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and heap[child] < heap[smallest]:
+                    smallest = child
+            if smallest == index:
+                break
+            self._swap(index, smallest)
+            index = smallest
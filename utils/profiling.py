@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict
+
+from utils.state_publisher import atomic_write
+
+# Upper bounds (ms) of the histogram buckets, doubling from 10 µs to ~84 s;
+# slower phases share an overflow bucket
+BUCKET_BOUNDS_MS = [0.01 * 2 ** i for i in range(24)]
+BUCKET_LABELS = [f"{bound:g}" for bound in BUCKET_BOUNDS_MS] + ["inf"]
+
+
+class PhaseHistogram:
+    """Fixed log-scale histogram of one phase's durations
+
+    Recording is a bisect and two additions, so timing every tick costs
+    microseconds. Percentiles are read from the buckets and are accurate to
+    within a factor of two, enough to tell which phase a slowdown is in.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.peak_kb: float | None = None
+
+    def record(self, ms: float):
+        self.counts[bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.last_ms = ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (ms) of the bucket holding percentile `q`, capped at the slowest call"""
+        if not self.count:
+            return 0.0
+        rank = max(1, q / 100 * self.count)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKET_BOUNDS_MS[index], self.max_ms) if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+            "last_ms": self.last_ms,
+            "peak_kb": self.peak_kb,
+            "buckets": {label: count for label, count in zip(BUCKET_LABELS, self.counts) if count}
+        }
+
+
+class TickProfiler:
+    """Per-phase timing histograms, tick budget overruns and sampled allocations
+
+    Wrap each cycle in `tick()` and its phases in `phase(name)`. A tick that
+    takes longer than `budget_s` counts as an overrun. With `sample_every`
+    set, every n-th tick also runs under tracemalloc and records the peak
+    allocation of each phase; the other ticks pay only for the timers.
+    `summary()` is JSON-ready and `write()` saves it atomically for other
+    processes to read.
+    """
+
+    def __init__(self, budget_s: float | None = None, sample_every: int | None = None):
+        self.budget_s = budget_s
+        self.sample_every = sample_every
+        self.started_at = time.time()
+        self.ticks = 0
+        self.overruns = 0
+        self.last_overrun_at: float | None = None
+        self._phases: Dict[str, PhaseHistogram] = {}
+        self._lock = threading.Lock()
+        self._sampling = False
+
+    def _histogram(self, name: str) -> PhaseHistogram:
+        histogram = self._phases.get(name)
+        if histogram is None:
+            histogram = self._phases.setdefault(name, PhaseHistogram())
+        return histogram
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time one phase of the current tick (or a stand-alone operation)"""
+        sampling = self._sampling
+        if sampling:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                histogram = self._histogram(name)
+                histogram.record(ms)
+                if sampling:
+                    histogram.peak_kb = (tracemalloc.get_traced_memory()[1] - base) / 1024
+
+    @contextmanager
+    def tick(self):
+        """Time one whole cycle against the budget"""
+        sample = bool(self.sample_every) and self.ticks % self.sample_every == 0 and not tracemalloc.is_tracing()
+        if sample:
+            tracemalloc.start()
+            self._sampling = True
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if sample:
+                self._sampling = False
+                tracemalloc.stop()
+            with self._lock:
+                self.ticks += 1
+                self._histogram("tick").record(elapsed * 1000)
+                if self.budget_s is not None and elapsed > self.budget_s:
+                    self.overruns += 1
+                    self.last_overrun_at = time.time()
+
+    def summary(self) -> Dict[str, Any]:
+        """Tick counters and a summary per phase"""
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "updated_at": time.time(),
+                "ticks": self.ticks,
+                "budget_ms": self.budget_s * 1000 if self.budget_s is not None else None,
+                "overruns": self.overruns,
+                "last_overrun_at": self.last_overrun_at,
+                "allocation_sample_every": self.sample_every,
+                "phases": {name: histogram.summary() for name, histogram in self._phases.items()}
+            }
+
+    def write(self, path: str):
+        """Save the summary to `path` atomically, as compact JSON"""
+        atomic_write(path, json.dumps(self.summary(), separators=(",", ":")))
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.ticks = 0
+            self.overruns = 0
+            self.last_overrun_at = None
+            self._phases = {}
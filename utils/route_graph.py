@@ -0,0 +1,217 @@
+import heapq
+import math
+from typing import List, Dict, Any, Tuple, Set
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Cost multiplier per track status; None closes the track to routing
+STATUS_COST_FACTORS = {
+    'normal': 1.0,
+    'congested': 1.5,
+    'maintenance': None,
+}
+
+Path = Tuple[Tuple[str, ...], float]
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def haversine_km_array(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """`haversine_km` over arrays of points"""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def _edge(a: str, b: str) -> Tuple[str, str]:
+    """Undirected edge key"""
+    return (a, b) if a <= b else (b, a)
+
+class RouteGraph:
+    """Weighted railway graph with cached shortest and alternate paths
+
+    Edge weights are the haversine length of a track scaled by its status.
+    Shortest-path trees are cached per source and k-alternate paths per
+    station pair. A track status change only drops the cache entries whose
+    answer it can actually change.
+    """
+
+    def __init__(self, stations: Dict[str, Dict[str, float]], tracks: List[Dict[str, Any]]):
+        self.stations = stations
+        self.adjacency: Dict[str, Dict[str, float]] = {name: {} for name in stations}
+        self.lengths_km: Dict[Tuple[str, str], float] = {}
+        self.track_statuses: Dict[Tuple[str, str], List[str]] = {}
+        self._trees: Dict[str, Tuple[Dict[str, float], Dict[str, str]]] = {}
+        self._alternates: Dict[Tuple[str, str, int], List[Path]] = {}
+
+        for track in tracks:
+            edge = _edge(track['from'], track['to'])
+            if edge not in self.lengths_km:
+                a, b = self.stations[edge[0]], self.stations[edge[1]]
+                self.lengths_km[edge] = haversine_km(a['lat'], a['lon'], b['lat'], b['lon'])
+            self.track_statuses.setdefault(edge, []).append(track['status'])
+            self._apply_weight(edge)
+
+    def _weight(self, edge: Tuple[str, str]) -> float | None:
+        """Cost of the cheapest open track between two stations, or None if all are closed"""
+        factors = [STATUS_COST_FACTORS.get(status, 1.0) for status in self.track_statuses[edge]]
+        factors = [factor for factor in factors if factor is not None]
+        return self.lengths_km[edge] * min(factors) if factors else None
+
+    def _apply_weight(self, edge: Tuple[str, str]):
+        """Write an edge's current weight into the adjacency map"""
+        a, b = edge
+        weight = self._weight(edge)
+        if weight is None:
+            self.adjacency[a].pop(b, None)
+            self.adjacency[b].pop(a, None)
+        else:
+            self.adjacency[a][b] = weight
+            self.adjacency[b][a] = weight
+
+    def length_km(self, a: str, b: str) -> float:
+        """Physical length of the track between two adjacent stations"""
+        return self.lengths_km[_edge(a, b)]
+
+    def edge_weight(self, a: str, b: str) -> float:
+        """Current cost between two adjacent stations (inf if not connected)"""
+        return self.adjacency[a].get(b, math.inf)
+
+    def open_tracks(self) -> int:
+        """Number of tracks not closed for maintenance"""
+        return sum(
+            STATUS_COST_FACTORS.get(status, 1.0) is not None
+            for statuses in self.track_statuses.values() for status in statuses
+        )
+
+    def set_track_status(self, from_station: str, to_station: str, status: str):
+        """Change the status of the tracks between two stations and invalidate affected routes"""
+        edge = _edge(from_station, to_station)
+        if edge not in self.track_statuses:
+            raise KeyError(f'No track between {from_station} and {to_station}')
+        old = self.edge_weight(*edge)
+        self.track_statuses[edge] = [status] * len(self.track_statuses[edge])
+        self._apply_weight(edge)
+        new = self.edge_weight(*edge)
+        if new > old:
+            self._invalidate_increase(edge)
+        elif new < old:
+            self._invalidate_decrease(edge, new)
+
+    def _invalidate_increase(self, edge: Tuple[str, str]):
+        """An edge got dearer: only trees and paths that use it can change"""
+        a, b = edge
+        for source in list(self._trees):
+            parent = self._trees[source][1]
+            if parent.get(a) == b or parent.get(b) == a:
+                del self._trees[source]
+        for key in list(self._alternates):
+            if any(self._path_uses(path, edge) for path, _ in self._alternates[key]):
+                del self._alternates[key]
+
+    def _invalidate_decrease(self, edge: Tuple[str, str], weight: float):
+        """An edge got cheaper: only answers it can now undercut are dropped"""
+        a, b = edge
+        for source in list(self._trees):
+            dist = self._trees[source][0]
+            if abs(dist.get(a, math.inf) - dist.get(b, math.inf)) > weight:
+                del self._trees[source]
+        for key in list(self._alternates):
+            source, _, k = key
+            paths = self._alternates[key]
+            if len(paths) < k:
+                del self._alternates[key]
+                continue
+            # Any path through the edge costs at least dist(source, a or b) + weight
+            dist = self._tree(source)[0]
+            lower_bound = min(dist.get(a, math.inf), dist.get(b, math.inf)) + weight
+            if lower_bound < paths[-1][1]:
+                del self._alternates[key]
+
+    @staticmethod
+    def _path_uses(path: Tuple[str, ...], edge: Tuple[str, str]) -> bool:
+        return any(_edge(u, v) == edge for u, v in zip(path, path[1:]))
+
+    def _dijkstra(self, source: str, target: str | None = None,
+                  banned_edges: Set[Tuple[str, str]] = frozenset(),
+                  banned_nodes: Set[str] = frozenset()) -> Tuple[Dict[str, float], Dict[str, str]]:
+        """Distances and parents from `source`, stopping early once `target` is settled"""
+        dist = {source: 0.0}
+        parent: Dict[str, str] = {}
+        heap = [(0.0, source)]
+        done = set()
+        while heap:
+            d, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            if node == target:
+                break
+            for neighbour, weight in self.adjacency[node].items():
+                if neighbour in banned_nodes or (banned_edges and _edge(node, neighbour) in banned_edges):
+                    continue
+                nd = d + weight
+                if nd < dist.get(neighbour, math.inf):
+                    dist[neighbour] = nd
+                    parent[neighbour] = node
+                    heapq.heappush(heap, (nd, neighbour))
+        return dist, parent
+
+    def _tree(self, source: str) -> Tuple[Dict[str, float], Dict[str, str]]:
+        """Cached shortest-path tree from a source"""
+        tree = self._trees.get(source)
+        if tree is None:
+            tree = self._trees[source] = self._dijkstra(source)
+        return tree
+
+    @staticmethod
+    def _walk(parent: Dict[str, str], source: str, target: str) -> Tuple[str, ...]:
+        path = [target]
+        while path[-1] != source:
+            path.append(parent[path[-1]])
+        return tuple(reversed(path))
+
+    def shortest_path(self, source: str, target: str) -> Path | None:
+        """Cheapest path between two stations as (stations, cost), or None"""
+        dist, parent = self._tree(source)
+        if target not in dist:
+            return None
+        return self._walk(parent, source, target), dist[target]
+
+    def alternate_paths(self, source: str, target: str, k: int = 3) -> List[Path]:
+        """Up to k cheapest loop-free paths between two stations (Yen's algorithm)"""
+        key = (source, target, k)
+        if key in self._alternates:
+            return self._alternates[key]
+
+        best = self.shortest_path(source, target)
+        paths = [best] if best else []
+        candidates: List[Tuple[float, Tuple[str, ...]]] = []
+        seen = {best[0]} if best else set()
+        while paths and len(paths) < k:
+            last = paths[-1][0]
+            for i in range(len(last) - 1):
+                spur, root = last[i], last[:i + 1]
+                root_cost = sum(self.edge_weight(u, v) for u, v in zip(root, root[1:]))
+                banned_edges = {_edge(p[i], p[i + 1]) for p, _ in paths if p[:i + 1] == root}
+                dist, parent = self._dijkstra(spur, target, banned_edges, set(root[:-1]))
+                if target not in dist:
+                    continue
+                path = root[:-1] + self._walk(parent, spur, target)
+                if path not in seen:
+                    seen.add(path)
+                    heapq.heappush(candidates, (root_cost + dist[target], path))
+            if not candidates:
+                break
+            cost, path = heapq.heappop(candidates)
+            paths.append((path, cost))
+
+        self._alternates[key] = paths
+        return paths
@@ -0,0 +1,151 @@
+import numpy as np
+from typing import Tuple
+
+from utils.route_graph import EARTH_RADIUS_KM, haversine_km_array
+from utils.train_index import TrainIndex
+
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+CELL_DEGREES = 0.1  # grid cell side, about 11 km of latitude
+_STRIDE = 1 << 16   # cell codes are lat_cell * _STRIDE + lon_cell, both shifted positive
+_OFFSET = _STRIDE // 2
+
+
+def radius_box(lat: float, lon: float, km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) enclosing a circle of `km` around a point"""
+    dlat = km / KM_PER_DEGREE
+    dlon = km / (KM_PER_DEGREE * max(np.cos(np.radians(lat)), 0.01))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+class FleetSpatialIndex:
+    """Uniform lat/lon grid over a FleetStore's train positions, for radius, nearest and box queries
+
+    Every train is filed under the grid cell it falls in, with one row set per
+    cell, so a query looks only at the cells overlapping its area and then
+    checks exact distances for those rows. Attached as a fleet listener for
+    the lat/lon columns, it re-files only the trains whose writes moved them
+    into another cell. Use `spatial_index` to share one index per fleet
+    between its consumers.
+    """
+
+    def __init__(self, cell_degrees: float = CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.cells = TrainIndex()
+        self.size = 0
+        self._cell = np.empty(0, dtype=np.int64)
+        self.fleet = None
+
+    def positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes and longitudes of every indexed train, by row"""
+        return self.fleet.column('lat'), self.fleet.column('lon')
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _cell_coords(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        return (np.floor(np.asarray(lat) / self.cell_degrees).astype(np.int64) + _OFFSET,
+                np.floor(np.asarray(lon) / self.cell_degrees).astype(np.int64) + _OFFSET)
+
+    def _codes(self, lat, lon) -> np.ndarray:
+        lat_cell, lon_cell = self._cell_coords(lat, lon)
+        return lat_cell * _STRIDE + lon_cell
+
+    def rebuild(self):
+        """File every point from scratch"""
+        lat, lon = self.positions()
+        self._cell = self._codes(lat, lon)
+        self.size = len(self._cell)
+        self.cells = TrainIndex()
+        self.cells.move_many(np.arange(len(self._cell)), np.full(len(self._cell), -1), self._cell)
+
+    def add(self, row: int):
+        """File a new point (rows are added in order)"""
+        lat, lon = self.positions()
+        if row >= len(self._cell):
+            grown = np.full(max(row + 1, 2 * len(self._cell)), -1, dtype=np.int64)
+            grown[:len(self._cell)] = self._cell
+            self._cell = grown
+        code = int(self._codes(lat[row], lon[row]))
+        self._cell[row] = code
+        self.size = max(self.size, row + 1)
+        self.cells.add(row, code)
+
+    def moved(self, rows: np.ndarray):
+        """Re-file points whose coordinates changed; only cell crossings touch the index"""
+        lat, lon = self.positions()
+        rows = np.atleast_1d(rows)
+        new = self._codes(lat[rows], lon[rows])
+        self.cells.move_many(rows, self._cell[rows], new)
+        self._cell[rows] = new
+
+    def _candidates(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """Rows in the cells overlapping a box (a superset of the rows inside it)"""
+        (lat0, lat1), (lon0, lon1) = self._cell_coords([min_lat, max_lat], [min_lon, max_lon])
+        n_cells = (lat1 - lat0 + 1) * (lon1 - lon0 + 1)
+        if n_cells > len(self.cells.rows):
+            # The box spans more cells than are occupied: walk the occupied ones instead
+            codes = [code for code, rows in self.cells.rows.items()
+                     if rows and lat0 <= code // _STRIDE <= lat1 and lon0 <= code % _STRIDE <= lon1]
+        else:
+            codes = [lat_cell * _STRIDE + lon_cell
+                     for lat_cell in range(lat0, lat1 + 1) for lon_cell in range(lon0, lon1 + 1)]
+        rows = self.cells.lookup(codes)
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def in_box(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """Sorted rows inside a lat/lon box"""
+        rows = self._candidates(min_lat, min_lon, max_lat, max_lon)
+        lat, lon = self.positions()
+        inside = (lat[rows] >= min_lat) & (lat[rows] <= max_lat) & (lon[rows] >= min_lon) & (lon[rows] <= max_lon)
+        return np.sort(rows[inside])
+
+    def within(self, lat: float, lon: float, km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows within `km` of a point and their distances, nearest first"""
+        rows = self._candidates(*radius_box(lat, lon, km))
+        lats, lons = self.positions()
+        distances = haversine_km_array(lat, lon, lats[rows], lons[rows])
+        inside = distances <= km
+        rows, distances = rows[inside], distances[inside]
+        order = np.lexsort((rows, distances))
+        return rows[order], distances[order]
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """The `k` rows nearest a point and their distances, nearest first
+
+        Searches a growing radius until it holds `k` points; every point
+        inside an exact radius is found, so the first `k` are the nearest.
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        km = self.cell_degrees * KM_PER_DEGREE
+        while True:
+            rows, distances = self.within(lat, lon, km)
+            if len(rows) >= k or km > np.pi * EARTH_RADIUS_KM:
+                return rows[:k], distances[:k]
+            km *= 2
+
+    def attach(self, fleet):
+        """Start following `fleet` (a FleetStore), replacing any fleet followed so far"""
+        if self.fleet is not None:
+            self.fleet.remove_listener(self)
+        self.fleet = fleet
+        self.rebuild()
+        fleet.add_listener(self, fields=('lat', 'lon'))
+
+    def on_append(self, fleet, row: int):
+        self.add(row)
+
+    def on_change(self, fleet, field: str, rows: np.ndarray, old: np.ndarray, new: np.ndarray):
+        if field in ('lat', 'lon'):
+            self.moved(rows)
+
+
+def spatial_index(fleet) -> FleetSpatialIndex:
+    """The spatial index following `fleet`, attaching one on first use"""
+    for listener in fleet.listeners:
+        if isinstance(listener, FleetSpatialIndex):
+            return listener
+    index = FleetSpatialIndex()
+    index.attach(fleet)
+    return index
@@ -0,0 +1,70 @@
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple
+
+
+def freeze(value: Any) -> Any:
+    """Deep read-only copy: dicts become mapping proxies and lists become tuples"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Plain dict/list copy of a frozen value, e.g. for JSON encoding"""
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class Snapshot(NamedTuple):
+    """One immutable published state"""
+    version: int
+    published_at: float
+    data: Mapping[str, Any]
+
+
+class StateBus:
+    """Publishes immutable, versioned state snapshots between threads
+
+    The publisher hands over a complete state and the bus swaps in a frozen
+    copy under a lock. Readers therefore always get one whole version, never a
+    mix of two. Subscribers can compare versions to skip unchanged states, or
+    block in `wait_for_version` until something new is published.
+    """
+
+    def __init__(self, initial: Dict[str, Any] | None = None):
+        self._condition = threading.Condition()
+        self._snapshot = Snapshot(0, time.time(), freeze(initial or {}))
+
+    def publish(self, state: Dict[str, Any]) -> Snapshot:
+        """Publish a new state and wake any waiting subscribers"""
+        data = freeze(state)
+        with self._condition:
+            self._snapshot = Snapshot(self._snapshot.version + 1, time.time(), data)
+            self._condition.notify_all()
+            return self._snapshot
+
+    def latest(self) -> Snapshot:
+        """The most recently published snapshot"""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def changed_since(self, version: int) -> bool:
+        """True if a newer version than `version` has been published"""
+        return self._snapshot.version > version
+
+    def wait_for_version(self, version: int, timeout: float | None = None) -> Snapshot | None:
+        """Block until a version newer than `version` is published, or None on timeout"""
+        with self._condition:
+            if self._condition.wait_for(lambda: self._snapshot.version > version, timeout):
+                return self._snapshot
+            return None
@@ -0,0 +1,204 @@
+import copy
+import json
+import os
+import tempfile
+from typing import Dict, Any, List
+
+SNAPSHOT_EVERY = 20  # versions between full snapshots
+
+_MISSING = object()
+
+
+def _encode(data: Any) -> str:
+    """Compact JSON encoding"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _is_keyed_list(value: Any) -> bool:
+    """A list of dicts that all carry an "id" can be diffed by id"""
+    return isinstance(value, list) and all(isinstance(item, dict) and "id" in item for item in value)
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-key changes turning `old` into `new`; empty if nothing changed
+
+    Dicts are diffed by key, lists of dicts with an "id" by id, and anything
+    else is replaced whole.
+    """
+    delta = {}
+    for key, value in new.items():
+        old_value = old.get(key, _MISSING)
+        if value == old_value:
+            continue
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            delta[key] = {
+                "set": {k: v for k, v in value.items() if old_value.get(k, _MISSING) != v},
+                "unset": [k for k in old_value if k not in value]
+            }
+        elif _is_keyed_list(value) and old_value is not _MISSING and _is_keyed_list(old_value):
+            old_by_id = {item["id"]: item for item in old_value}
+            new_ids = [item["id"] for item in value]
+            kept = set(new_ids)
+            change = {
+                "upsert": [item for item in value if old_by_id.get(item["id"]) != item],
+                "remove": [item_id for item_id in old_by_id if item_id not in kept]
+            }
+            if new_ids != [item["id"] for item in old_value]:
+                change["order"] = new_ids
+            delta[key] = change
+        else:
+            delta[key] = {"replace": value}
+    for key in old:
+        if key not in new:
+            delta[key] = {"delete": True}
+    return delta
+
+
+def apply_delta(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a new state with `delta` applied (the input is left untouched)"""
+    state = dict(state)
+    for key, change in delta.items():
+        if change.get("delete"):
+            state.pop(key, None)
+        elif "replace" in change:
+            state[key] = change["replace"]
+        elif "set" in change:
+            value = dict(state.get(key, {}))
+            value.update(change["set"])
+            for k in change["unset"]:
+                value.pop(k, None)
+            state[key] = value
+        else:
+            by_id = {item["id"]: item for item in state.get(key, [])}
+            for item_id in change["remove"]:
+                by_id.pop(item_id, None)
+            order = change.get("order") or [item_id for item_id in by_id]
+            for item in change["upsert"]:
+                if item["id"] not in by_id and "order" not in change:
+                    order.append(item["id"])
+                by_id[item["id"]] = item
+            state[key] = [by_id[item_id] for item_id in order]
+    return state
+
+
+def atomic_write(path: str, text: str):
+    """Write a file so readers only ever see the old or the new contents"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class StatePublisher:
+    """Publishes versioned state atomically: periodic snapshots plus small deltas
+
+    Every `snapshot_every` versions the full state is written to `path` via a
+    temp file and rename. In between, one compact delta record per version is
+    appended to ``<path>.deltas``. Publishing an unchanged state writes nothing.
+    """
+
+    def __init__(self, path: str = "state.json", snapshot_every: int = SNAPSHOT_EVERY):
+        self.path = path
+        self.delta_path = path + ".deltas"
+        self.snapshot_every = snapshot_every
+        self.version = 0
+        self._last: Dict[str, Any] | None = None
+        self._deltas_since_snapshot = 0
+
+    def publish(self, state: Dict[str, Any]) -> int:
+        """Publish a state and return its version"""
+        if self._last is not None:
+            delta = diff_state(self._last, state)
+            if not delta:
+                return self.version
+        self.version += 1
+        if self._last is None or self._deltas_since_snapshot >= self.snapshot_every:
+            # Empty the delta log first; readers skip deltas older than their snapshot
+            atomic_write(self.delta_path, "")
+            atomic_write(self.path, _encode({"version": self.version, "state": state}))
+            self._deltas_since_snapshot = 0
+        else:
+            with open(self.delta_path, "a", encoding="utf-8") as f:
+                f.write(_encode({"version": self.version, "base": self.version - 1, "delta": delta}) + "\n")
+            self._deltas_since_snapshot += 1
+        self._last = {key: copy.copy(value) for key, value in state.items()}
+        return self.version
+
+
+class StateReader:
+    """Follows a StatePublisher's files, loading only what changed
+
+    `poll` stats the snapshot and delta files and returns False straight away
+    when neither changed. Otherwise it reloads the snapshot only if a new one
+    was written, and applies just the delta records it has not seen yet.
+    The delta log is read again from the start whenever it may have been
+    replaced: after a new snapshot (the publisher empties the log first), when
+    its inode changes or it shrinks, and when the byte before the read offset
+    is not the end of a record, which catches a replacement reusing the inode.
+    """
+
+    def __init__(self, path: str = "state.json"):
+        self.path = path
+        self.delta_path = path + ".deltas"
+        self.version = 0
+        self.state: Dict[str, Any] | None = None
+        self._snapshot_stat = None
+        self._delta_stat = None
+        self._delta_offset = 0
+
+    @staticmethod
+    def _stat(path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def poll(self) -> bool:
+        """Bring the state up to date; True if the version changed"""
+        version = self.version
+        snapshot_stat = self._stat(self.path)
+        if snapshot_stat is not None and snapshot_stat != self._snapshot_stat:
+            with open(self.path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._snapshot_stat = snapshot_stat
+            if snapshot["version"] > self.version:
+                self.version, self.state = snapshot["version"], snapshot["state"]
+                self._delta_offset = 0  # the deltas after this snapshot are in a fresh log
+
+        delta_stat = self._stat(self.delta_path)
+        if delta_stat is not None and delta_stat != self._delta_stat:
+            if (self._delta_stat is None or delta_stat[0] != self._delta_stat[0]
+                    or delta_stat[1] < self._delta_stat[1] or delta_stat[1] < self._delta_offset):
+                self._delta_offset = 0  # a new delta log replaced the old one, or it was truncated
+            self._delta_stat = delta_stat
+            for record in self._read_new_deltas():
+                if self.state is not None and record["base"] == self.version:
+                    self.state = apply_delta(self.state, record["delta"])
+                    self.version = record["version"]
+        return self.version != version
+
+    def _read_new_deltas(self) -> List[Dict[str, Any]]:
+        """Complete delta records appended since the last read"""
+        with open(self.delta_path, "rb") as f:
+            if self._delta_offset:
+                f.seek(self._delta_offset - 1)
+                if f.read(1) != b"\n":
+                    # Not a record boundary: the log was replaced under the same inode
+                    self._delta_offset = 0
+                    f.seek(0)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # a half-written last line waits for the next poll
+        self._delta_offset += end
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # a torn line left by a replaced log; records are matched by base version
+        return records
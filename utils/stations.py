@@ -0,0 +1,74 @@
+import numpy as np
+from typing import Dict, Iterable, Tuple
+
+from utils.route_graph import haversine_km_array
+
+# Station positions, shared by the train generator, the network map and the timetable loader
+STATION_COORDS = {
+    'New Delhi': {'lat': 28.6139, 'lon': 77.2090},
+    'Mumbai Central': {'lat': 19.0176, 'lon': 72.8562},
+    'Chennai Central': {'lat': 13.0827, 'lon': 80.2707},
+    'Kolkata': {'lat': 22.5726, 'lon': 88.3639},
+    'Bangalore City': {'lat': 12.9716, 'lon': 77.5946},
+    'Hyderabad': {'lat': 17.3850, 'lon': 78.4867},
+    'Vijayawada': {'lat': 16.5062, 'lon': 80.6480},
+    'Visakhapatnam': {'lat': 17.6868, 'lon': 83.2185},
+    'Tirupati': {'lat': 13.6288, 'lon': 79.4192},
+    'Guntur': {'lat': 16.3067, 'lon': 80.4365},
+    'Rajahmundry': {'lat': 17.0005, 'lon': 81.8044},
+    'Kurnool': {'lat': 15.8309, 'lon': 78.0422},
+    'Nellore': {'lat': 14.4426, 'lon': 79.9864},
+    'Kadapa': {'lat': 14.4753, 'lon': 78.8252},
+    'Anantapur': {'lat': 14.6819, 'lon': 77.6006}
+}
+
+# Position used for stations without known coordinates
+DEFAULT_COORDS = {'lat': 16.0, 'lon': 80.0}
+
+
+class StationTable:
+    """Station coordinates as arrays, built once and shared
+
+    Looking up many stations at once is a dict lookup per distinct name
+    followed by array indexing, instead of a coordinates dict per train.
+    """
+
+    def __init__(self, coords: Dict[str, Dict[str, float]] = STATION_COORDS):
+        self.names = list(coords)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+        # One extra slot at the end holds the default position for unknown stations
+        self.lat = np.array([coords[name]['lat'] for name in self.names] + [DEFAULT_COORDS['lat']])
+        self.lon = np.array([coords[name]['lon'] for name in self.names] + [DEFAULT_COORDS['lon']])
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.codes
+
+    def coords(self, name: str) -> Dict[str, float]:
+        """Coordinates of one station (the default position if unknown)"""
+        code = self.codes.get(name, -1)
+        return {'lat': float(self.lat[code]), 'lon': float(self.lon[code])}
+
+    def lookup(self, names: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes and longitudes of several stations"""
+        codes = np.array([self.codes.get(name, -1) for name in names], dtype=np.intp)
+        return self.lat[codes], self.lon[codes]
+
+    def nearest(self, lats, lons, chunk: int = 65_536) -> Tuple[np.ndarray, np.ndarray]:
+        """Code of the nearest station to each position and its distance in km
+
+        With a handful of stations a distance matrix beats any tree; it is
+        built a chunk of positions at a time to bound memory for large fleets.
+        """
+        lats, lons = np.atleast_1d(lats), np.atleast_1d(lons)
+        station_lat, station_lon = self.lat[:-1], self.lon[:-1]
+        codes = np.empty(len(lats), dtype=np.intp)
+        distances = np.empty(len(lats))
+        for start in range(0, len(lats), chunk):
+            part = slice(start, start + chunk)
+            matrix = haversine_km_array(lats[part, None], lons[part, None], station_lat, station_lon)
+            codes[part] = matrix.argmin(axis=1)
+            distances[part] = matrix[np.arange(len(matrix)), codes[part]]
+        return codes, distances
+
+
+STATION_TABLE = StationTable()
@@ -0,0 +1,150 @@
+import asyncio
+import inspect
+from typing import Any, Callable, Dict
+
+SKIP = "skip"          # after an overrun, run one tick at once for all the missed deadlines
+CATCH_UP = "catch_up"  # after an overrun, run the missed ticks back to back
+OVERRUN_POLICIES = (SKIP, CATCH_UP)
+
+
+class TickJob:
+    """One periodic callback and its cadence statistics"""
+
+    def __init__(self, name: str, callback: Callable[[], Any], interval: float, overrun: str,
+                 max_catch_up: int, offset: float):
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"overrun must be one of {', '.join(OVERRUN_POLICIES)}, not {overrun!r}")
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.overrun = overrun
+        self.max_catch_up = max_catch_up
+        self.offset = offset
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+        self.last_lateness = 0.0
+        self.errors = 0
+        self.last_error: str | None = None
+        self.task: asyncio.Task | None = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "overrun_policy": self.overrun,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "last_lateness_ms": self.last_lateness * 1000,
+            "max_lateness_ms": self.max_lateness * 1000,
+            "errors": self.errors,
+            "last_error": self.last_error
+        }
+
+
+class TickScheduler:
+    """Fires periodic jobs on fixed deadlines on an asyncio loop
+
+    Tick n of a job is due at start + n * interval, so the time a tick takes
+    never pushes the next one back and the cadence does not drift under load.
+    A tick that ends after the following deadline has passed is an overrun;
+    the job's policy then either runs a single tick at once for all the
+    missed deadlines (SKIP) or runs one per missed deadline back to back, at
+    most `max_catch_up` of them (CATCH_UP). Many jobs share one loop, each
+    with its own interval and statistics. Callbacks may be plain functions or
+    coroutine functions; an exception in one is counted and the job keeps its
+    cadence.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, TickJob] = {}
+
+    def add(self, name: str, callback: Callable[[], Any], interval: float, overrun: str = SKIP,
+            max_catch_up: int = 10, offset: float = 0.0) -> TickJob:
+        """Register a job; it starts with the scheduler, or at once if that is running
+
+        The first tick fires `offset` seconds after the start, which lets jobs
+        with the same interval be staggered instead of all firing together.
+        """
+        if name in self.jobs:
+            raise ValueError(f"A job named {name!r} is already scheduled")
+        job = self.jobs[name] = TickJob(name, callback, interval, overrun, max_catch_up, offset)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return job
+        self._start(job)
+        return job
+
+    def _start(self, job: TickJob):
+        if job.task is None:
+            job.task = asyncio.get_running_loop().create_task(self._run(job), name=f"tick-{job.name}")
+
+    async def remove(self, name: str):
+        """Stop a job and forget it"""
+        job = self.jobs.pop(name)
+        if job.task is not None:
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+
+    async def _call(self, job: TickJob):
+        try:
+            result = job.callback()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            job.errors += 1
+            job.last_error = repr(e)
+
+    async def _run(self, job: TickJob):
+        loop = asyncio.get_running_loop()
+        start = loop.time() + job.offset
+        due = 0  # index of the next deadline
+        behind = 0
+        while True:
+            deadline = start + due * job.interval
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lateness = max(0.0, loop.time() - deadline)
+            job.last_lateness = lateness
+            job.max_lateness = max(job.max_lateness, lateness)
+            await self._call(job)
+            job.ticks += 1
+            due += 1
+
+            was_behind, behind = behind, int((loop.time() - start) // job.interval) - due + 1
+            if behind > 0:
+                if was_behind <= 0:
+                    job.overruns += 1  # catch-up ticks still running late are the same overrun
+                if job.overrun == SKIP:
+                    missed = behind - 1
+                else:
+                    missed = max(0, behind - job.max_catch_up)
+                job.skipped += missed
+                due += missed
+
+    async def run(self, duration: float | None = None):
+        """Run every job, for `duration` seconds or until cancelled"""
+        for job in self.jobs.values():
+            self._start(job)
+        try:
+            if duration is None:
+                await asyncio.Event().wait()
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        tasks = [job.task for job in self.jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self.jobs.values():
+            job.task = None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Cadence statistics per job"""
+        return {name: job.stats() for name, job in self.jobs.items()}
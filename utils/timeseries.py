@@ -0,0 +1,123 @@
+import time
+from typing import Any, Dict, Mapping, Sequence, Tuple
+
+import numpy as np
+
+# (bucket seconds, buckets kept): an hour of seconds, a day of minutes, a month of hours
+DEFAULT_TIERS = ((1, 3600), (60, 24 * 60), (3600, 30 * 24))
+MAX_POINTS = 1500  # most buckets a query returns; longer spans read a coarser tier
+
+
+class RollupTier:
+    """Fixed-size ring of time buckets holding count, sum, min and max per metric
+
+    Samples falling in the newest bucket are folded into it; a sample in a
+    later bucket advances the ring, overwriting the oldest bucket. Samples
+    older than the newest bucket are folded into it rather than dropped.
+    """
+
+    def __init__(self, resolution: float, capacity: int, metrics: int):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.start = np.zeros(capacity, dtype=np.float64)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.sum = np.zeros((capacity, metrics), dtype=np.float64)
+        self.min = np.zeros((capacity, metrics), dtype=np.float64)
+        self.max = np.zeros((capacity, metrics), dtype=np.float64)
+        self.head = -1  # slot of the newest bucket
+        self.filled = 0
+
+    def add(self, at: float, values: np.ndarray):
+        bucket = at - at % self.resolution
+        head = self.head
+        if head >= 0 and bucket <= self.start[head]:
+            self.count[head] += 1
+            self.sum[head] += values
+            np.minimum(self.min[head], values, out=self.min[head])
+            np.maximum(self.max[head], values, out=self.max[head])
+            return
+        head = self.head = (head + 1) % self.capacity
+        self.filled = min(self.filled + 1, self.capacity)
+        self.start[head] = bucket
+        self.count[head] = 1
+        self.sum[head] = self.min[head] = self.max[head] = values
+
+    @property
+    def wrapped(self) -> bool:
+        """True once the oldest buckets are being overwritten"""
+        return self.filled == self.capacity
+
+    def oldest(self) -> float | None:
+        """Start of the oldest bucket still held"""
+        if not self.filled:
+            return None
+        return float(self.start[(self.head - self.filled + 1) % self.capacity])
+
+    def slots(self, since: float | None = None) -> np.ndarray:
+        """Ring slots in time order, optionally only buckets ending after `since`"""
+        slots = np.arange(self.head - self.filled + 1, self.head + 1) % self.capacity
+        if since is not None:
+            slots = slots[self.start[slots] + self.resolution > since]
+        return slots
+
+    @property
+    def nbytes(self) -> int:
+        return self.start.nbytes + self.count.nbytes + self.sum.nbytes + self.min.nbytes + self.max.nbytes
+
+
+class TimeSeriesStore:
+    """Bounded-memory metric history with per-second, per-minute and per-hour rollups
+
+    Every sample is folded into each tier, so memory is fixed by the tier
+    sizes however long the dashboard runs. `query` reads from the finest tier
+    that still covers the requested span in at most `max_points` buckets,
+    which keeps the number of points (and so the chart's render time)
+    bounded too.
+    """
+
+    def __init__(self, metrics: Sequence[str], tiers: Sequence[Tuple[float, int]] = DEFAULT_TIERS,
+                 max_points: int = MAX_POINTS):
+        self.metrics = tuple(metrics)
+        self.max_points = max_points
+        self.tiers = [RollupTier(resolution, capacity, len(self.metrics)) for resolution, capacity in tiers]
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self.version
+
+    def append(self, values: Mapping[str, float], at: float | None = None):
+        """Record one sample of every metric at epoch time `at` (now by default)"""
+        at = time.time() if at is None else at
+        row = np.array([values[metric] for metric in self.metrics], dtype=np.float64)
+        for tier in self.tiers:
+            tier.add(at, row)
+        self.version += 1
+
+    def tier_for(self, since: float | None) -> RollupTier:
+        """Finest tier holding everything since `since` (or its whole history) in at most `max_points` buckets"""
+        for tier in self.tiers:
+            oldest = tier.oldest()
+            if oldest is None:
+                return tier
+            covers = not tier.wrapped or (since is not None and oldest <= since + tier.resolution)
+            start = oldest if since is None else max(since, oldest)
+            span = tier.start[tier.head] - start
+            if covers and span / tier.resolution < self.max_points:
+                return tier
+        return self.tiers[-1]
+
+    def query(self, since: float | None = None) -> Dict[str, Any]:
+        """Bucket start times and mean/min/max of every metric since `since`"""
+        tier = self.tier_for(since)
+        slots = tier.slots(since)
+        count = tier.count[slots, None]
+        mean, low, high = tier.sum[slots] / np.maximum(count, 1), tier.min[slots], tier.max[slots]
+        result = {'resolution': tier.resolution, 'time': tier.start[slots]}
+        for i, metric in enumerate(self.metrics):
+            result[metric] = {'mean': mean[:, i], 'min': low[:, i], 'max': high[:, i]}
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the rollup arrays, fixed at construction"""
+        return sum(tier.nbytes for tier in self.tiers)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, time as dt_time
+from typing import Any, Callable, Dict, Iterator
+
+from utils.fleet_store import DEFAULT_PRIORITY, DEFAULT_TYPE
+from utils.stations import STATION_TABLE, StationTable
+
+TIMETABLE_COLUMNS = ['train_id', 'type', 'priority', 'arrival_time', 'departure_time', 'section']
+
+# Everything but the train id repeats heavily, so it is read as categories
+TIMETABLE_DTYPES = {
+    'train_id': str,
+    'type': 'category',
+    'priority': 'category',
+    'arrival_time': 'category',
+    'departure_time': 'category',
+    'section': 'category',
+}
+
+CHUNK_ROWS = 200_000
+SECTION_SEPARATOR = '-'  # a section is written "<from station>-<to station>"
+
+# Numeric priorities as used by the simulation, mapped onto the fleet's levels
+PRIORITY_LEVELS = {'3': 'High', '2': 'Medium', '1': 'Low'}
+
+
+def _recode(values: pd.Categorical, convert: Callable[[str], str], missing: str = '') -> pd.Categorical:
+    """Apply `convert` to the categories only, merging categories that end up equal; blanks become `missing`"""
+    converted = np.array([convert(category) for category in values.categories] + [missing], dtype=object)
+    categories, inverse = np.unique(converted, return_inverse=True)
+    return pd.Categorical.from_codes(inverse[values.codes], categories=categories).remove_unused_categories()
+
+
+def _seconds(values: pd.Categorical) -> np.ndarray:
+    """Seconds after midnight of "HH:MM[:SS]" times, parsed once per distinct time"""
+    times = [time if time.count(':') == 2 else time + ':00' for time in values.categories]
+    seconds = np.append(pd.to_timedelta(times).total_seconds().to_numpy(), np.nan)
+    return seconds[values.codes]
+
+
+def _section_end(section: str, end: int) -> str:
+    parts = section.split(SECTION_SEPARATOR, 1)
+    return parts[min(end, len(parts) - 1)].strip()
+
+
+def read_timetable(path: str, chunksize: int = CHUNK_ROWS, service_date: datetime | None = None,
+                   stations: StationTable = STATION_TABLE) -> Iterator[Dict[str, Any]]:
+    """Stream a timetable CSV as batches of train runs, one chunk at a time
+
+    Each CSV row is one section of a train's journey. Consecutive rows of the
+    same train form a run; every batch holds per run the train id, type and
+    priority, the first section's origin and last section's destination
+    (as Categoricals), the origin's coordinates from the shared station table,
+    and its departure as epoch seconds on `service_date` (today by default).
+    Only one chunk of the file is in memory at a time, and station names,
+    times and priorities are resolved once per distinct value, not per row.
+    A blank type or priority reads as DEFAULT_TYPE or DEFAULT_PRIORITY.
+    """
+    midnight = datetime.combine((service_date or datetime.now()).date(), dt_time()).timestamp()
+    reader = pd.read_csv(path, usecols=TIMETABLE_COLUMNS, dtype=TIMETABLE_DTYPES, chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk.dropna(subset=['train_id', 'section'])
+        if chunk.empty:
+            continue
+        ids = chunk['train_id'].to_numpy(dtype=object)
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        ends = np.r_[starts[1:], len(ids)] - 1
+
+        section = chunk['section'].array
+        origin = _recode(section, lambda s: _section_end(s, 0))
+        destination = _recode(section, lambda s: _section_end(s, 1))
+        lat, lon = stations.lookup(origin.categories)
+        origin_codes = origin.codes[starts]
+
+        departure = _seconds(chunk['departure_time'].array)[starts]
+        arrival = _seconds(chunk['arrival_time'].array)[starts]
+        departure = np.where(np.isnan(departure), arrival, departure)
+
+        yield {
+            'rows': len(chunk),
+            'train_id': ids[starts],
+            'type': _recode(chunk['type'].array, str, DEFAULT_TYPE)[starts],
+            'priority': _recode(chunk['priority'].array, lambda p: PRIORITY_LEVELS.get(p, p), DEFAULT_PRIORITY)[starts],
+            'current_station': origin[starts],
+            'destination': destination[ends],
+            'lat': lat[origin_codes],
+            'lon': lon[origin_codes],
+            'last_updated': midnight + np.nan_to_num(departure),
+        }
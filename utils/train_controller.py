@@ -1,32 +1,93 @@
 import random
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence, Tuple
+
+import numpy as np
+
+from utils.decision_journal import DecisionJournal, journal_now
+from utils.delay_propagation import DelayPropagator
+from utils.fleet_store import FleetSelection, FleetStore
+from utils.metrics_engine import EventWindow, StreamingMetrics
+from utils.occupancy import BlockOccupancy
+from utils.route_graph import RouteGraph, haversine_km
+from utils.spatial_index import spatial_index
+from utils.stations import STATION_TABLE
+
+EXPRESS_TYPES = ['Rajdhani Express', 'Shatabdi Express', 'Vande Bharat', 'Duronto Express']
+
+TRAINS_PER_TRACK = 2   # trains one track section can hold at a time
+DEFAULT_CAPACITY = 20  # network capacity in trains when there is no route graph
+PROXIMITY_KM = 10      # radius of "trains near" a station or train
+
+def filter_trains(trains: Sequence[Dict[str, Any]], field: str, values: List[str]) -> Sequence[Dict[str, Any]]:
+    """Trains whose `field` is one of `values`, using the fleet indexes when available"""
+    if isinstance(trains, FleetStore):
+        return trains.select(**{field: values})
+    return [t for t in trains if t[field] in values]
+
+def trains_near(trains: Sequence[Dict[str, Any]], lat: float, lon: float,
+                km: float = PROXIMITY_KM) -> Sequence[Dict[str, Any]]:
+    """Trains within `km` of a point, nearest first, using the fleet's spatial index when available"""
+    if isinstance(trains, FleetStore):
+        rows, _ = spatial_index(trains).within(lat, lon, km)
+        return FleetSelection(trains, rows)
+    near = [(haversine_km(lat, lon, t['position']['lat'], t['position']['lon']), i) for i, t in enumerate(trains)]
+    return [trains[i] for distance, i in sorted(near) if distance <= km]
+
+def reroute_via(reroute: Dict[str, Any] | None) -> str:
+    """How a recommendation names a reroute: its stations, or nothing when there is no alternative"""
+    return f'via {" → ".join(reroute["path"])}' if reroute else ''
+
+def nearest_station(train: Dict[str, Any]) -> Tuple[str, float]:
+    """Station nearest to a train's position and its distance in km"""
+    codes, distances = STATION_TABLE.nearest(train['position']['lat'], train['position']['lon'])
+    return STATION_TABLE.names[codes[0]], float(distances[0])
 
 class TrainController:
     """Handles train control operations and decision making"""
     
-    def __init__(self):
-        self.decision_history = []
+    def __init__(self, route_graph: RouteGraph | None = None, movements: EventWindow | None = None,
+                 journal: DecisionJournal | None = None):
+        self.decision_history = journal if journal is not None else DecisionJournal()
+        self.route_graph = route_graph
+        self.propagator = DelayPropagator(route_graph) if route_graph is not None else None
+        self.occupancy = BlockOccupancy(route_graph) if route_graph is not None else None
+        self.metrics = StreamingMetrics(self.capacity(), movements)
+    
+    def capacity(self) -> int:
+        """Trains the network can hold: open track sections times trains per section"""
+        if self.route_graph is None:
+            return DEFAULT_CAPACITY
+        return self.route_graph.open_tracks() * TRAINS_PER_TRACK
+    
+    def record_movement(self, kind: str, at: float | None = None):
+        """Count an observed arrival or departure towards throughput"""
+        self.metrics.record_event(kind, at)
     
     def calculate_metrics(self, trains: List[Dict[str, Any]]) -> Dict[str, float]:
-        """Calculate system performance metrics"""
-        if not trains:
-            return {'avg_delay': 0, 'throughput': 0, 'utilization': 0}
-        
-        # Calculate average delay
-        total_delay = sum(train['delay_minutes'] for train in trains)
-        avg_delay = total_delay / len(trains)
+        """Calculate system performance metrics
+
+        A FleetStore is followed incrementally, so after the first call this
+        reads running totals instead of scanning the trains. Throughput is the
+        rate of recorded arrivals and departures over the last hour.
+        """
+        self.metrics.capacity = self.capacity()
+        if isinstance(trains, FleetStore):
+            if self.metrics.fleet is not trains:
+                self.metrics.attach(trains)
+            return self.metrics.snapshot()
         
-        # Calculate throughput (trains per hour - simulated)
-        # In a real system, this would be based on actual throughput data
-        throughput = random.uniform(15, 25)
+        throughput = self.metrics.throughput()
+        if not trains:
+            return {'avg_delay': 0, 'p50_delay': 0, 'p95_delay': 0, 'throughput': throughput, 'utilization': 0}
         
-        # Calculate utilization (percentage of track capacity used)
-        on_time_trains = len([t for t in trains if t['status'] == 'On Time'])
-        utilization = (len(trains) / 20) * 100  # Assuming max capacity of 20 trains
+        delays = np.array([train['delay_minutes'] for train in trains])
+        utilization = len(trains) / self.metrics.capacity * 100 if self.metrics.capacity else 0
         
         return {
-            'avg_delay': avg_delay,
+            'avg_delay': float(delays.mean()),
+            'p50_delay': float(np.percentile(delays, 50, method='inverted_cdf')),
+            'p95_delay': float(np.percentile(delays, 95, method='inverted_cdf')),
             'throughput': throughput,
             'utilization': min(100, utilization)
         }
@@ -36,24 +97,41 @@ class TrainController:
         recommendations = []
         
         # Find problematic trains
-        delayed_trains = [t for t in trains if t['status'] == 'Delayed']
-        waiting_trains = [t for t in trains if t['status'] == 'Waiting']
-        express_trains = [t for t in trains if t['type'] in ['Rajdhani Express', 'Shatabdi Express', 'Vande Bharat', 'Duronto Express']]
+        delayed_trains = filter_trains(trains, 'status', ['Delayed'])
+        waiting_trains = filter_trains(trains, 'status', ['Waiting'])
+        express_trains = filter_trains(trains, 'type', EXPRESS_TYPES)
         
         # Generate recommendations based on current situation
         if delayed_trains:
             train = random.choice(delayed_trains)
+            reroute = self.suggest_reroute(train)
+            # Only recommend a reroute there is a route for
+            if reroute:
+                recommendations.append({
+                    'action': f'Reroute {train["train_id"]} {reroute_via(reroute)} to reduce delay',
+                    'reason': f'Train is delayed by {train["delay_minutes"]} minutes',
+                    'priority': 'High' if train['type'] in EXPRESS_TYPES else 'Medium'
+                })
+        
+        conflicts = self.detect_conflicts(trains, limit=1)
+        if conflicts:
+            conflict = conflicts[0]
+            clash = 'would share' if conflict['kind'] == 'conflict' else 'is closer than headway on'
             recommendations.append({
-                'action': f'Reroute {train["train_id"]} via alternative track to reduce delay',
-                'reason': f'Train is delayed by {train["delay_minutes"]} minutes',
-                'priority': 'High' if train['type'] in ['Rajdhani Express', 'Shatabdi Express', 'Vande Bharat', 'Duronto Express'] else 'Medium'
+                'action': f'Hold {conflict["other_train_id"]} before {conflict["block"]}',
+                'reason': f'{conflict["other_train_id"]} {clash} the block with {conflict["train_id"]} '
+                          f'in {conflict["at_minutes"]:.0f} min',
+                'priority': 'High'
             })
-        
+
         if waiting_trains:
             train = random.choice(waiting_trains)
+            station, distance = nearest_station(train)
+            # Trains close behind a stranded train are the ones it will hold up
+            nearby = len(trains_near(trains, train['position']['lat'], train['position']['lon'])) - 1
             recommendations.append({
-                'action': f'Dispatch maintenance crew to {train["current_station"]} for {train["train_id"]}',
-                'reason': 'Train is waiting due to technical issues',
+                'action': f'Dispatch maintenance crew from {station} ({distance:.0f} km) to {train["train_id"]}',
+                'reason': f'Train is waiting due to technical issues; {nearby} other trains within {PROXIMITY_KM} km',
                 'priority': 'High'
             })
         
@@ -98,17 +176,68 @@ class TrainController:
         
         return recommendations[:5]  # Return top 5 recommendations
     
+    def suggest_reroute(self, train: Dict[str, Any]) -> Dict[str, Any] | None:
+        """Best alternative to a train's shortest route, or None without a graph, stations or alternative"""
+        if self.route_graph is None:
+            return None
+        source, target = train.get('current_station'), train.get('destination')
+        if source not in self.route_graph.stations or target not in self.route_graph.stations:
+            return None
+        paths = self.route_graph.alternate_paths(source, target, k=2)
+        if len(paths) < 2:
+            return None
+        (_, primary_km), (path, cost_km) = paths[0], paths[1]
+        return {
+            'train_id': train.get('train_id', train.get('id')),
+            'path': list(path),
+            'cost_km': cost_km,
+            'extra_km': cost_km - primary_km
+        }
+    
+    def suggest_reroutes(self, trains: Sequence[Dict[str, Any]], limit: int | None = None) -> List[Dict[str, Any]]:
+        """Reroute suggestions for delayed trains, most delayed first
+
+        Paths are cached per station pair in the route graph, so this stays
+        cheap for hundreds of delayed trains.
+        """
+        delayed = sorted(filter_trains(trains, 'status', ['Delayed']), key=lambda t: -t['delay_minutes'])
+        suggestions = []
+        for train in delayed:
+            reroute = self.suggest_reroute(train)
+            if reroute:
+                reroute['delay_minutes'] = train['delay_minutes']
+                suggestions.append(reroute)
+                if limit is not None and len(suggestions) >= limit:
+                    break
+        return suggestions
+    
+    def detect_conflicts(self, trains: Sequence[Dict[str, Any]], limit: int | None = None) -> List[Dict[str, Any]]:
+        """Predicted block conflicts and headway violations, soonest first; none without a graph"""
+        if self.occupancy is None or not trains:
+            return []
+        fleet = trains if isinstance(trains, FleetStore) else FleetStore.from_records(trains)
+        return self.occupancy.update(fleet).conflicts(fleet, limit)
+
+    def propagate_disruption(self, trains: Sequence[Dict[str, Any]], train: Dict[str, Any], minutes: int) -> str:
+        """Apply the knock-on delays of holding `train` to the fleet; a note for the decision log"""
+        if self.propagator is None or not isinstance(trains, FleetStore):
+            return ''
+        knock_on = self.propagator.apply(trains, train.row, minutes)
+        affected = int(np.count_nonzero(knock_on))
+        return f', knock-on +{int(knock_on.sum())} min over {affected} trains' if affected else ''
+    
     def inject_delay(self, trains: List[Dict[str, Any]]):
-        """Inject random delay to a random train"""
+        """Inject random delay to a random train, and its knock-on delays to the trains behind it"""
         if trains:
             train = random.choice(trains)
             additional_delay = random.randint(10, 30)
             train['delay_minutes'] += additional_delay
             train['status'] = 'Delayed'
+            knock_on = self.propagate_disruption(trains, train, additional_delay)
             
             self.decision_history.append({
-                'timestamp': datetime.now(),
-                'action': f'Delay injected to {train["train_id"]} (+{additional_delay} min)',
+                'timestamp': journal_now(),
+                'action': f'Delay injected to {train["train_id"]} (+{additional_delay} min{knock_on})',
                 'type': 'system_action'
             })
     
@@ -116,7 +245,7 @@ class TrainController:
         """Simulate breakdown for a random train"""
         if trains:
             # Prefer trains that are currently moving
-            moving_trains = [t for t in trains if t['status'] in ['On Time', 'Delayed']]
+            moving_trains = filter_trains(trains, 'status', ['On Time', 'Delayed'])
             target_trains = moving_trains if moving_trains else trains
             
             train = random.choice(target_trains)
@@ -124,21 +253,25 @@ class TrainController:
             train['speed'] = 0
             breakdown_delay = random.randint(20, 60)
             train['delay_minutes'] += breakdown_delay
+            knock_on = self.propagate_disruption(trains, train, breakdown_delay)
             
             self.decision_history.append({
-                'timestamp': datetime.now(),
-                'action': f'Breakdown simulated for {train["train_id"]} (+{breakdown_delay} min)',
+                'timestamp': journal_now(),
+                'action': f'Breakdown simulated for {train["train_id"]} (+{breakdown_delay} min{knock_on})',
                 'type': 'system_action'
             })
     
     def apply_recommendation(self, recommendation: Dict[str, str]):
         """Apply a recommended action"""
         self.decision_history.append({
-            'timestamp': datetime.now(),
+            'timestamp': journal_now(),
             'action': recommendation['action'],
             'type': 'recommendation_applied'
         })
     
-    def get_decision_history(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent decision history"""
-        return self.decision_history[-limit:] if self.decision_history else []
+    def get_decision_history(self, limit: int = 10, start: datetime | None = None,
+                             end: datetime | None = None) -> List[Dict[str, Any]]:
+        """Get recent decision history, or the decisions between `start` and `end`"""
+        if start is None and end is None:
+            return self.decision_history.recent(limit)
+        return self.decision_history.query(start, end, limit)
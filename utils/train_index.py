@@ -0,0 +1,48 @@
+import numpy as np
+from typing import Dict, Set, Iterable
+
+
+class TrainIndex:
+    """Secondary index from a categorical code to the fleet rows holding it
+
+    Rows are kept in one set per code, so lookups and counts are O(1) and a
+    change only touches the rows that actually moved between codes.
+    """
+
+    def __init__(self):
+        self.rows: Dict[int, Set[int]] = {}
+
+    def add(self, row: int, code: int):
+        """Index a row under a code"""
+        self.rows.setdefault(code, set()).add(row)
+
+    def move(self, row: int, old: int, new: int):
+        """Re-index a single row whose code changed (old < 0 means unindexed)"""
+        if old == new:
+            return
+        if old >= 0:
+            self.rows[old].discard(row)
+        self.add(row, new)
+
+    def move_many(self, rows: np.ndarray, old: np.ndarray, new: np.ndarray):
+        """Re-index a batch of rows; only rows whose code changed are touched"""
+        changed = old != new
+        if not changed.any():
+            return
+        rows, old, new = rows[changed], old[changed], new[changed]
+        for code in np.unique(old):
+            if code >= 0:
+                self.rows[int(code)].difference_update(rows[old == code].tolist())
+        for code in np.unique(new):
+            self.rows.setdefault(int(code), set()).update(rows[new == code].tolist())
+
+    def lookup(self, codes: Iterable[int]) -> Set[int]:
+        """Rows indexed under any of the codes"""
+        result: Set[int] = set()
+        for code in codes:
+            result |= self.rows.get(code, set())
+        return result
+
+    def count(self, code: int) -> int:
+        """Number of rows indexed under a code"""
+        return len(self.rows.get(code, ()))